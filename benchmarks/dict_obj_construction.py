@@ -0,0 +1,42 @@
+"""
+Benchmark for constructing nested DictObj/FinalDictObj, each node should be copied exactly once,
+so the time per node stays flat when the nesting depth grows.
+
+```bash
+python3 benchmarks/dict_obj_construction.py
+```
+"""
+import timeit
+from typing import Dict
+
+from pythonic_toolbox.utils.dict_utils import DictObj, FinalDictObj
+
+DEPTHS = [1, 2, 4, 8, 16, 32, 64, 128]
+LEAVES_PER_LEVEL = 10
+
+
+def gen_nested_dict(depth: int) -> Dict:
+    """a chain of nested dicts, every level has LEAVES_PER_LEVEL leaves and a list of two small dicts"""
+    node: Dict = {}
+    for level in range(depth):
+        node = {
+            **{f'key_{i}': f'val_{level}_{i}' for i in range(LEAVES_PER_LEVEL)},
+            'items': [{'id': 1}, {'id': 2}],
+            'child': node,
+        }
+    return node
+
+
+def main():
+    print(f'{"class":<14}{"depth":>8}{"nodes":>8}{"total(ms)":>12}{"per node(us)":>14}')
+    for cls in (DictObj, FinalDictObj):
+        for depth in DEPTHS:
+            data = gen_nested_dict(depth)
+            nodes = depth * 3 + 1
+            number = max(1, 2000 // depth)
+            total = min(timeit.repeat(lambda: cls(data), number=number, repeat=3)) / number
+            print(f'{cls.__name__:<14}{depth:>8}{nodes:>8}{total * 1e3:>12.3f}{total / nodes * 1e6:>14.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+Benchmark for memory and read time of a DictObj tree with different lock policies,
+with 'instance' policy every node carries its own Lock and RLock once it is used.
+
+```bash
+python3 benchmarks/dict_obj_lock_policy.py
+```
+"""
+import timeit
+import tracemalloc
+from typing import Dict, List
+
+from pythonic_toolbox.utils.dict_utils import DictObj
+
+NODES = 100_000
+
+
+def gen_records(n: int) -> Dict:
+    return {'records': [{'id': i, 'name': f'name_{i}'} for i in range(n)]}
+
+
+def touch_all(obj: DictObj) -> int:
+    """read every record, locks are created on first use"""
+    records: List[DictObj] = obj.records
+    return sum(record.id for record in records)
+
+
+def main():
+    data = gen_records(NODES)
+    print(f'{"lock_policy":<14}{"nodes":>10}{"bytes/node":>14}{"read(ms)":>12}')
+    for lock_policy in ('instance', 'shared', 'none'):
+        tracemalloc.start()
+        obj = DictObj(data, lock_policy=lock_policy)
+        touch_all(obj)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        total = min(timeit.repeat(lambda: touch_all(obj), number=1, repeat=3))
+        print(f'{lock_policy:<14}{NODES:>10}{size / NODES:>14.1f}{total * 1e3:>12.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""
+Benchmark suite for DictObj, FinalDictObj, RangeKeyDict and StrKeyIdDict,
+results are written to a JSON file, and can be compared with the results of a previous run (e.g. last release),
+the exit code is 1 if any case is slower than the baseline by more than the threshold.
+
+```bash
+python3 benchmarks/dict_utils_suite.py --output baseline.json
+# after changing the code
+python3 benchmarks/dict_utils_suite.py --output current.json --compare baseline.json --threshold 0.2
+```
+"""
+import argparse
+import copy
+import json
+import platform
+import sys
+import threading
+import time
+import timeit
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from pythonic_toolbox.utils.dict_utils import DictObj, FinalDictObj, RangeKeyDict, StrKeyIdDict
+
+SIZES = [10, 1000]
+DEPTHS = [1, 16]
+THREAD_COUNTS = [1, 4]
+QUICK_SIZES = [10]
+QUICK_DEPTHS = [1]
+QUICK_THREAD_COUNTS = [1, 2]
+
+# (name, params, function to benchmark)
+Case = Tuple[str, Dict, Callable[[], object]]
+
+
+def gen_doc(size: int, depth: int) -> Dict:
+    """size leaves on each level, nested depth levels"""
+    node: Dict = {}
+    for level in range(depth):
+        node = {**{f'key_{i}': i for i in range(size)}, 'child': node}
+    return node
+
+
+def dict_obj_cases(sizes: List[int], depths: List[int]) -> Iterator[Case]:
+    for cls in (DictObj, FinalDictObj):
+        for size in sizes:
+            for depth in depths:
+                params = {'size': size, 'depth': depth}
+                doc = gen_doc(size, depth)
+                obj = cls(doc)
+                other = cls(doc)
+                yield f'{cls.__name__}.construct', params, lambda cls=cls, doc=doc: cls(doc)
+                yield f'{cls.__name__}.to_dict', params, obj.to_dict
+                yield f'{cls.__name__}.copy', params, lambda obj=obj: copy.copy(obj)
+                yield f'{cls.__name__}.deepcopy', params, lambda obj=obj: copy.deepcopy(obj)
+                yield f'{cls.__name__}.eq', params, lambda obj=obj, other=other: obj == other
+                yield f'{cls.__name__}.getattr', params, lambda obj=obj: obj.key_0
+                yield f'{cls.__name__}.getitem', params, lambda obj=obj: obj['key_0']
+                if cls is DictObj:
+                    lock_free_obj = cls(doc, lock_free_reads=True)
+                    yield f'{cls.__name__}.getattr_lock_free_reads', params, lambda obj=lock_free_obj: obj.key_0
+                    yield f'{cls.__name__}.setattr', params, lambda obj=obj: setattr(obj, 'key_0', 1)
+                    yield f'{cls.__name__}.setitem', params, lambda obj=obj: obj.__setitem__('key_0', 1)
+
+
+def dict_obj_thread_cases(thread_counts: List[int]) -> Iterator[Case]:
+    reads_per_thread = 10000
+
+    def read_in_threads(obj, n_threads):
+        def read():
+            for _ in range(reads_per_thread):
+                _ = obj.key_0
+
+        threads = [threading.Thread(target=read) for _ in range(n_threads)]
+        [t.start() for t in threads]
+        [t.join() for t in threads]
+
+    for name, obj in (('DictObj', DictObj(gen_doc(10, 1))),
+                      ('DictObj(lock_free_reads)', DictObj(gen_doc(10, 1), lock_free_reads=True)),
+                      ('FinalDictObj', FinalDictObj(gen_doc(10, 1)))):
+        for n_threads in thread_counts:
+            params = {'threads': n_threads, 'reads_per_thread': reads_per_thread}
+            yield f'{name}.threaded_getattr', params, lambda obj=obj, n=n_threads: read_in_threads(obj, n)
+
+
+def range_key_dict_cases(sizes: List[int]) -> Iterator[Case]:
+    for size in sizes:
+        params = {'size': size}
+        input_dict = {(i * 10, i * 10 + 5): i for i in range(size)}
+        rkd = RangeKeyDict(input_dict)
+        yield 'RangeKeyDict.construct', params, lambda input_dict=input_dict: RangeKeyDict(input_dict)
+        yield 'RangeKeyDict.getitem', params, lambda rkd=rkd, key=size * 5 + 1: rkd[key]
+        yield 'RangeKeyDict.get_miss', params, lambda rkd=rkd, key=size * 5 + 7: rkd.get(key)
+
+
+def str_key_id_dict_cases(sizes: List[int]) -> Iterator[Case]:
+    for size in sizes:
+        params = {'size': size}
+        input_dict = {i: i for i in range(size)}
+        skd = StrKeyIdDict(input_dict)
+        yield 'StrKeyIdDict.construct', params, lambda input_dict=input_dict: StrKeyIdDict(input_dict)
+        yield 'StrKeyIdDict.from_rows', params, lambda input_dict=input_dict: StrKeyIdDict.from_rows(input_dict.items())
+        yield 'StrKeyIdDict.getitem_str', params, lambda skd=skd: skd['0']
+        yield 'StrKeyIdDict.getitem_int', params, lambda skd=skd: skd[0]
+        yield 'StrKeyIdDict.setitem', params, lambda skd=skd: skd.__setitem__(0, 1)
+
+
+def time_case(func: Callable[[], object], min_time: float) -> float:
+    """seconds per call, best of 3 runs, each run lasts at least min_time"""
+    number = 1
+    while True:
+        elapsed = timeit.timeit(func, number=number)
+        if elapsed >= min_time:
+            break
+        number *= 10
+    return min([elapsed] + timeit.repeat(func, number=number, repeat=2)) / number
+
+
+def case_id(name: str, params: Dict) -> str:
+    return name + '[' + ','.join(f'{key}={val}' for key, val in sorted(params.items())) + ']'
+
+
+def run(quick: bool, min_time: float, name_filter: str) -> Dict:
+    sizes, depths, thread_counts = (QUICK_SIZES, QUICK_DEPTHS, QUICK_THREAD_COUNTS) if quick else (
+        SIZES, DEPTHS, THREAD_COUNTS)
+    cases = [*dict_obj_cases(sizes, depths), *dict_obj_thread_cases(thread_counts),
+             *range_key_dict_cases(sizes), *str_key_id_dict_cases(sizes)]
+    results = {}
+    for name, params, func in cases:
+        if name_filter not in name:
+            continue
+        seconds = time_case(func, min_time)
+        results[case_id(name, params)] = {'name': name, 'params': params, 'seconds_per_call': seconds}
+        print(f'{case_id(name, params):<80}{seconds * 1e6:>14.3f} us')
+    return {
+        'meta': {'python': sys.version, 'platform': platform.platform(), 'time': time.time()},
+        'results': results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """return ids of the cases slower than baseline by more than threshold (0.1 means 10%)"""
+    regressions = []
+    print(f'\n{"case":<80}{"baseline(us)":>14}{"current(us)":>14}{"change":>10}')
+    for cid, result in current['results'].items():
+        if cid not in baseline['results']:
+            continue
+        before = baseline['results'][cid]['seconds_per_call']
+        after = result['seconds_per_call']
+        change = after / before - 1
+        mark = ''
+        if change > threshold:
+            regressions.append(cid)
+            mark = '  <-- regression'
+        print(f'{cid:<80}{before * 1e6:>14.3f}{after * 1e6:>14.3f}{change:>+10.1%}{mark}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--compare', metavar='BASELINE', help='compare with results in this JSON file')
+    parser.add_argument('--threshold', type=float, default=0.1, help='slowdown ratio treated as regression')
+    parser.add_argument('--min-time', type=float, default=0.05, help='minimum seconds for each timing run')
+    parser.add_argument('--filter', default='', help='only run cases whose name contains this string')
+    parser.add_argument('--quick', action='store_true', help='smaller sizes, for smoke testing')
+    args = parser.parse_args()
+
+    current = run(quick=args.quick, min_time=args.min_time, name_filter=args.filter)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f'\n{len(regressions)} regression(s) over {args.threshold:.0%}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
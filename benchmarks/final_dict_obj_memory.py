@@ -0,0 +1,34 @@
+"""
+Benchmark for memory of many same-shaped records as FinalDictObj and CompactFinalDictObj.
+
+```bash
+python3 benchmarks/final_dict_obj_memory.py
+```
+"""
+import tracemalloc
+from typing import Dict, List
+
+from pythonic_toolbox.utils.dict_utils import CompactFinalDictObj, FinalDictObj
+
+RECORDS = 100_000
+
+
+def gen_records(n: int) -> List[Dict]:
+    return [{'id': i, 'name': 'albert', 'age': 33, 'address': {'city': 'Beijing', 'zip': '100000'}}
+            for i in range(n)]
+
+
+def main():
+    records = gen_records(RECORDS)
+    print(f'{"class":<22}{"records":>10}{"bytes/record":>14}')
+    for cls in (FinalDictObj, CompactFinalDictObj):
+        tracemalloc.start()
+        objs = [cls(record) for record in records]
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f'{cls.__name__:<22}{len(objs):>10}{size / len(objs):>14.1f}')
+        del objs
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+"""
+Benchmark for constructing RangeKeyDict from a dict and from pre-sorted (begin, end, value) rows.
+
+```bash
+python3 benchmarks/range_key_dict_construction.py
+```
+"""
+import timeit
+
+from pythonic_toolbox.utils.dict_utils import RangeKeyDict
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def main():
+    print(f'{"ranges":>10}{"__init__(ms)":>14}{"from_sorted(ms)":>17}')
+    for size in SIZES:
+        rows = [(i * 10, i * 10 + 5, i) for i in range(size)]
+        input_dict = {(begin, end): val for begin, end, val in rows}
+        number = max(1, 100_000 // size)
+        init = min(timeit.repeat(lambda: RangeKeyDict(input_dict), number=number, repeat=3)) / number
+        from_sorted = min(timeit.repeat(lambda: RangeKeyDict.from_sorted(rows), number=number, repeat=3)) / number
+        print(f'{size:>10}{init * 1e3:>14.2f}{from_sorted * 1e3:>17.2f}')
+
+
+if __name__ == '__main__':
+    main()
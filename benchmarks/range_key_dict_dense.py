@@ -0,0 +1,34 @@
+"""
+Benchmark for RangeKeyDict lookups of small integer domains, before and after compile_dense.
+
+```bash
+python3 benchmarks/range_key_dict_dense.py
+```
+"""
+import timeit
+
+from pythonic_toolbox.utils.dict_utils import RangeKeyDict
+
+LOOKUPS = 100_000
+
+
+def main():
+    age_buckets = RangeKeyDict({(0, 2): 'Baby', (2, 15): 'Children', (15, 25): 'Youth',
+                                (25, 65): 'Adults', (65, 123): 'Seniors'})
+    hours = RangeKeyDict({(hour, hour + 1): f'{hour:02d}:00' for hour in range(24)})
+    print(f'{"table":<14}{"bisect(us)":>12}{"dense(us)":>12}')
+    for name, range_key_dict, keys in (('age_buckets', age_buckets, list(range(123)) * 10),
+                                       ('hours', hours, list(range(24)) * 50)):
+        def lookup():
+            for key in keys:
+                range_key_dict[key]
+
+        number = max(1, LOOKUPS // len(keys))
+        bisect = min(timeit.repeat(lookup, number=number, repeat=5)) / (number * len(keys))
+        range_key_dict.compile_dense()
+        dense = min(timeit.repeat(lookup, number=number, repeat=5)) / (number * len(keys))
+        print(f'{name:<14}{bisect * 1e6:>12.3f}{dense * 1e6:>12.3f}')
+
+
+if __name__ == '__main__':
+    main()
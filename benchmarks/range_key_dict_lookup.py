@@ -0,0 +1,48 @@
+"""
+Benchmark for RangeKeyDict lookups, the time per lookup should grow logarithmically with the number of ranges,
+batch lookups by get_many amortize per-key overhead, and are linear for sorted keys,
+lookup_array resolves numpy arrays at once (skipped if numpy is not installed),
+range queries by items(begin, end) near the end of the table should grow logarithmically as well.
+
+```bash
+python3 benchmarks/range_key_dict_lookup.py
+```
+"""
+import random
+import timeit
+
+from pythonic_toolbox.utils.dict_utils import RangeKeyDict
+
+SIZES = [100, 1_000, 10_000, 100_000, 1_000_000]
+LOOKUPS = 10_000
+
+
+def main():
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    print(f'{"ranges":>10}{"per lookup(us)":>16}{"get_many(us)":>14}{"sorted(us)":>12}{"array(us)":>12}{"items(us)":>12}')
+    for size in SIZES:
+        range_key_dict = RangeKeyDict({(i * 10, i * 10 + 5): i for i in range(size)})
+        rand = random.Random(size)
+        keys = [rand.randrange(size * 10) for _ in range(LOOKUPS)]
+        sorted_keys = sorted(keys)
+        total = min(timeit.repeat(lambda: [range_key_dict.get(key) for key in keys], number=1, repeat=5))
+        batch = min(timeit.repeat(lambda: range_key_dict.get_many(keys), number=1, repeat=5))
+        batch_sorted = min(timeit.repeat(lambda: range_key_dict.get_many(sorted_keys), number=1, repeat=5))
+        if np is not None:
+            key_array = np.array(keys)
+            array = min(timeit.repeat(lambda: range_key_dict.lookup_array(key_array), number=1, repeat=5))
+            array_str = f'{array / LOOKUPS * 1e6:>12.3f}'
+        else:
+            array_str = f'{"-":>12}'
+        # the last 10 ranges
+        query = min(timeit.repeat(lambda: list(range_key_dict.items(size * 10 - 100, size * 10)),
+                                  number=100, repeat=5)) / 100
+        print(f'{size:>10}{total / LOOKUPS * 1e6:>16.3f}{batch / LOOKUPS * 1e6:>14.3f}'
+              f'{batch_sorted / LOOKUPS * 1e6:>12.3f}{array_str}{query * 1e6:>12.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Benchmark for StrKeyIdDict and IntIndexedStrKeyIdDict accessed by int/str IDs, compared with plain dict,
+plain dict is keyed by str and accessed with d[str(key)], which is what StrKeyIdDict saves callers from.
+
+```bash
+python3 benchmarks/str_key_id_dict.py
+```
+"""
+import timeit
+
+from pythonic_toolbox.utils.dict_utils import IntIndexedStrKeyIdDict, StrKeyIdDict
+
+SIZE = 100_000
+NUMBER = 1_000_000
+
+
+def main():
+    data = {str(i): i for i in range(SIZE)}
+    int_key, str_key, miss_key = SIZE // 2, str(SIZE // 2), SIZE * 2
+    cases = {
+        'getitem_int': 'd[int_key]',
+        'getitem_str': 'd[str_key]',
+        'contains_int': 'int_key in d',
+        'contains_miss': 'miss_key in d',
+        'get_int': 'd.get(int_key)',
+        'setitem_int': 'd[int_key] = 1',
+    }
+    dict_cases = dict(cases, getitem_int='d[str(int_key)]', contains_int='str(int_key) in d',
+                      contains_miss='str(miss_key) in d', get_int='d.get(str(int_key))',
+                      setitem_int='d[str(int_key)] = 1')
+    candidates = [
+        ('dict', dict(data), dict_cases),
+        ('StrKeyIdDict', StrKeyIdDict(data), cases),
+        ('IntIndexedStrKeyIdDict', IntIndexedStrKeyIdDict(data), cases),
+    ]
+
+    print(f'{"case":<16}' + ''.join(f'{name + "(ns)":>28}' for name, _, _ in candidates))
+    for case in cases:
+        row = f'{case:<16}'
+        for _, d, stmts in candidates:
+            env = {'d': d, 'int_key': int_key, 'str_key': str_key, 'miss_key': miss_key}
+            seconds = min(timeit.repeat(stmts[case], globals=env, number=NUMBER, repeat=3))
+            row += f'{seconds / NUMBER * 1e9:>28.1f}'
+        print(row)
+
+
+if __name__ == '__main__':
+    main()
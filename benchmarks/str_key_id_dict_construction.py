@@ -0,0 +1,31 @@
+"""
+Benchmark for loading DB-like rows into StrKeyIdDict, with the constructor and with from_rows,
+compared with building a plain dict keyed by str IDs.
+
+```bash
+python3 benchmarks/str_key_id_dict_construction.py
+```
+"""
+import timeit
+
+from pythonic_toolbox.utils.dict_utils import IntIndexedStrKeyIdDict, StrKeyIdDict
+
+ROWS = 1_000_000
+
+
+def main():
+    rows = [{'id': i, 'name': f'name_{i}'} for i in range(ROWS)]
+    cases = {
+        'dict comprehension': lambda: {str(row['id']): row for row in rows},
+        'StrKeyIdDict(dict)': lambda: StrKeyIdDict({row['id']: row for row in rows}),
+        'StrKeyIdDict.from_rows': lambda: StrKeyIdDict.from_rows(rows, key='id'),
+        'IntIndexedStrKeyIdDict.from_rows': lambda: IntIndexedStrKeyIdDict.from_rows(rows, key='id'),
+    }
+    print(f'{"case":<36}{"rows":>10}{"total(ms)":>12}')
+    for name, func in cases.items():
+        total = min(timeit.repeat(func, number=1, repeat=3))
+        print(f'{name:<36}{ROWS:>10}{total * 1e3:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
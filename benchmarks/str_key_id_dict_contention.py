@@ -0,0 +1,79 @@
+"""
+Benchmark for StrKeyIdDict shared between threads behind one external lock,
+compared with ShardedStrKeyIdDict, each thread does a mix of reads and writes on random IDs.
+Under the GIL total throughput can not grow with threads, but the single lock adds contention on top of it,
+on free-threaded builds of Python reads of ShardedStrKeyIdDict scale with threads.
+
+```bash
+python3 benchmarks/str_key_id_dict_contention.py
+```
+"""
+import random
+import sys
+import threading
+import time
+from typing import Callable, List
+
+from pythonic_toolbox.utils.dict_utils import ShardedStrKeyIdDict, StrKeyIdDict
+
+SIZE = 10_000
+OPS_PER_THREAD = 100_000
+WRITE_RATIO = 0.1
+THREAD_COUNTS = [1, 2, 4, 8]
+
+
+def gen_ops(seed: int) -> List:
+    """(is_write, key) pairs"""
+    rnd = random.Random(seed)
+    return [(rnd.random() < WRITE_RATIO, rnd.randrange(SIZE)) for _ in range(OPS_PER_THREAD)]
+
+
+def locked_worker(d: StrKeyIdDict, lock: threading.Lock) -> Callable[[List], None]:
+    def work(ops):
+        for is_write, key in ops:
+            with lock:
+                if is_write:
+                    d[key] = key
+                else:
+                    _ = d[key]
+
+    return work
+
+
+def sharded_worker(d: ShardedStrKeyIdDict) -> Callable[[List], None]:
+    def work(ops):
+        for is_write, key in ops:
+            if is_write:
+                d[key] = key
+            else:
+                _ = d[key]
+
+    return work
+
+
+def run_threads(work: Callable[[List], None], n_threads: int) -> float:
+    ops_list = [gen_ops(seed) for seed in range(n_threads)]
+    threads = [threading.Thread(target=work, args=(ops,)) for ops in ops_list]
+    start = time.perf_counter()
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+    return time.perf_counter() - start
+
+
+def main():
+    gil_enabled = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print(f'python {sys.version.split()[0]}, GIL enabled: {gil_enabled}')
+    data = {i: i for i in range(SIZE)}
+    candidates = {
+        'StrKeyIdDict+Lock': lambda: locked_worker(StrKeyIdDict(data), threading.Lock()),
+        'ShardedStrKeyIdDict': lambda: sharded_worker(ShardedStrKeyIdDict(data)),
+    }
+    print(f'{"case":<24}{"threads":>8}{"total(ms)":>12}{"kops/s":>10}')
+    for name, make_worker in candidates.items():
+        for n_threads in THREAD_COUNTS:
+            total = min(run_threads(make_worker(), n_threads) for _ in range(3))
+            print(f'{name:<24}{n_threads:>8}{total * 1e3:>12.1f}{n_threads * OPS_PER_THREAD / total / 1e3:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
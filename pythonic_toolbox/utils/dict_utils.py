@@ -1,12 +1,25 @@
 import functools
+import itertools
 import numbers
-from bisect import bisect_left
-from collections import UserDict, namedtuple
-from collections.abc import MutableMapping, Mapping
+import operator
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, UserDict, namedtuple
+from collections.abc import MutableMapping, MutableSequence, Mapping
+import contextlib
 import copy
+import json
+import math
+import mmap
+import os
+import pickle
+import struct
+import sys
+import threading
+import time
+import weakref
 from keyword import iskeyword
-from operator import attrgetter
-from typing import (Any, Callable, Dict, Generic, Hashable, Iterator,
+from typing import (AbstractSet, Any, Callable, Dict, Generic, Hashable, IO, Iterable, Iterator,
                     List, Optional, Tuple, TypeVar, Union, Sequence,
                     Set)
 
@@ -234,58 +247,467 @@ class _MyUserDict(MutableMapping):
         return d
 
 
+_WRITE_THROUGH = 'write_through'
+_COPY_ON_WRITE = 'copy_on_write'
+
+
+class _ListView(MutableSequence):
+    """List proxy used by write-through DictObj views, dict/list elements are wrapped when accessed"""
+
+    def __init__(self, data: List, wrap: Callable[[Any], Any]):
+        self._data = data
+        self._wrap = wrap
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self._wrap(x) for x in self._data[idx]]
+        return self._wrap(self._data[idx])
+
+    def __setitem__(self, idx, value):
+        self._data[idx] = value
+
+    def __delitem__(self, idx):
+        del self._data[idx]
+
+    def __len__(self):
+        return len(self._data)
+
+    def insert(self, idx, value):
+        self._data.insert(idx, value)
+
+    def __eq__(self, other):
+        if isinstance(other, _ListView):
+            return list(self) == list(other)
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(self._data)
+
+
+# leaves of these types are kept as they are instead of being deep-copied
+_IMMUTABLE_LEAF_TYPES = frozenset({str, int, float, bool, complex, bytes, type(None)})
+
+
+def _validate_dict_obj_keys(in_dict: Dict) -> None:
+    if any(map(lambda key: not isinstance(key, str),
+               in_dict.keys())):
+        raise ValueError('input dict for DictObj/FinalDictObj must have only string keys')
+
+
+_LOCK_POLICIES = ('none', 'instance', 'shared')
+# placed in the lock slot of method_synchronized when no locking is wanted,
+# methods of DictObj skip locking altogether when they see it, see _synchronized
+_NO_LOCK = contextlib.nullcontext()
+
+
+def _lock_slot_name(obj: 'DictObj') -> str:
+    """name of the attribute where method_synchronized keeps the lock of obj"""
+    return f'_{type(obj).__name__}__synchronized_lock'
+
+
+def _apply_lock_policy(obj: 'DictObj', lock_policy: str, lock=None) -> None:
+    """
+    'instance' leaves locks to method_synchronized, which creates one per instance on first use,
+    'none' and 'shared' place a no-op lock or the given (or a new) RLock in the lock slot beforehand
+    """
+    if lock_policy == 'instance':
+        return
+    object.__setattr__(obj, '_DictObj__lock_policy', lock_policy)
+    if lock_policy == 'none':
+        lock = _NO_LOCK
+    elif lock is None:
+        lock = threading.RLock()
+    object.__setattr__(obj, _lock_slot_name(obj), lock)
+
+
+def _init_hidden_data(obj: 'DictObj', data: Dict, lazy: bool = False, parent: Optional['DictObj'] = None) -> None:
+    """set hidden data for a new DictObj, nested nodes inherit the concurrency mode from their parent"""
+    if parent is not None:
+        lock_free_reads = object.__getattribute__(parent, '_DictObj__lock_free_reads')
+        object.__setattr__(obj, '_DictObj__lock_free_reads', lock_free_reads)
+        lock_policy = object.__getattribute__(parent, '_DictObj__lock_policy')
+        if lock_policy == 'shared':
+            _apply_lock_policy(obj, lock_policy, object.__getattribute__(parent, '__dict__')[_lock_slot_name(parent)])
+        else:
+            _apply_lock_policy(obj, lock_policy)
+    object.__setattr__(obj, '_user_dict_hidden_data', data)
+    if lazy:
+        object.__setattr__(obj, '_DictObj__lazy', True)
+        object.__setattr__(obj, '_DictObj__pending_keys',
+                           {key for key, val in data.items() if isinstance(val, (dict, list, tuple))})
+
+
+def _synchronized(method):
+    """
+    method_synchronized for DictObj, sharing the same per-instance lock,
+    but with lock_policy='none' (the lock slot holds _NO_LOCK) the method is called directly
+    """
+    synchronized_method = method_synchronized(method)
+
+    @functools.wraps(method)
+    def inner(self, *args, **kwargs):
+        lock = object.__getattribute__(self, '__dict__').get(f'_{type(self).__name__}__synchronized_lock')
+        if lock is _NO_LOCK:
+            return method(self, *args, **kwargs)
+        if lock is None:
+            # the lock is created on first use
+            return synchronized_method(self, *args, **kwargs)
+        with lock:
+            return method(self, *args, **kwargs)
+
+    return inner
+
+
+def _read_synchronized(method):
+    """
+    _synchronized for reading methods of DictObj, no lock is taken in lock-free-read mode either,
+    the mode is read from the instance __dict__ (or the class default) in the same wrapper that takes the lock,
+    so neither mode pays for an extra layer of wrapping
+    """
+    synchronized_method = method_synchronized(method)
+
+    @functools.wraps(method)
+    def inner(self, *args, **kwargs):
+        __dict__ = object.__getattribute__(self, '__dict__')
+        cls = type(self)
+        if __dict__.get('_DictObj__lock_free_reads', cls._DictObj__lock_free_reads):
+            return method(self, *args, **kwargs)
+        lock = __dict__.get(f'_{cls.__name__}__synchronized_lock')
+        if lock is _NO_LOCK:
+            return method(self, *args, **kwargs)
+        if lock is None:
+            # the lock is created on first use
+            return synchronized_method(self, *args, **kwargs)
+        with lock:
+            return method(self, *args, **kwargs)
+
+    return inner
+
+
+def _iter_lines(buffer: Union[str, bytes, bytearray]) -> Iterator[Union[str, bytes, bytearray]]:
+    """lines of buffer one at a time, unlike splitlines() which builds the whole list up front"""
+    newline = '\n' if isinstance(buffer, str) else b'\n'
+    start, size = 0, len(buffer)
+    while start < size:
+        end = buffer.find(newline, start)
+        if end == -1:
+            end = size
+        yield buffer[start:end]
+        start = end + 1
+
+
+def _to_plain(data):
+    if isinstance(data, DictObj):
+        return data.to_dict()
+    elif isinstance(data, dict):
+        return {key: _to_plain(val) for key, val in data.items()}
+    elif isinstance(data, (list, tuple, _ListView)):
+        return [_to_plain(x) for x in data]
+    else:
+        return data
+
+
 class DictObj(_MyUserDict):
-    def __init__(self, in_dict: Dict):
+    __lazy = False
+    # keys whose values are still raw dicts/lists, only used in lazy mode
+    __pending_keys: AbstractSet[str] = frozenset()
+    # not None when the hidden data is a dict shared with the caller, see DictObj.view
+    __view_mode: Optional[str] = None
+    __lock_free_reads = False
+    __lock_policy = 'instance'
+
+    def __init__(self, in_dict: Dict, lazy: bool = False, lock_free_reads: bool = False,
+                 lock_policy: str = 'instance'):
+        """
+        :param in_dict: dict with string keys, nested dicts/lists are converted to DictObj/list
+        :param lazy: if True, nested dicts/lists are copied and converted only when they are first accessed,
+                     so construction is O(top-level keys) instead of O(whole tree).
+                     Leaves other than dict/list/tuple are shared with in_dict, don't mutate in_dict afterwards
+        :param lock_free_reads: if True, reads of this DictObj and its nested DictObj take no lock,
+                                writers still hold the lock, and publish a modified copy of the hidden data
+                                (O(n) for each write), so readers always see a consistent snapshot.
+                                keys()/items()/values() are views of the snapshot at the time they are called
+        :param lock_policy: locking of this DictObj and its nested DictObj,
+                            'instance': every DictObj creates its own lock on first use,
+                            'shared': the whole tree shares one lock, far less memory for large trees,
+                            'none': no locking at all, for single-threaded or read-only use
+        """
+        self._init_dict_obj(in_dict, lazy=lazy, lock_free_reads=lock_free_reads, lock_policy=lock_policy)
+
+    def _init_dict_obj(self, in_dict: Dict, lazy: bool, lock_free_reads: bool, lock_policy: str) -> None:
+        _validate_dict_obj_keys(in_dict)
+        if lock_policy not in _LOCK_POLICIES:
+            raise ValueError(f'lock_policy must be one of {", ".join(map(repr, _LOCK_POLICIES))}, '
+                             f'but got {repr(lock_policy)}')
+        _apply_lock_policy(self, lock_policy)
 
-        in_dict = copy.deepcopy(in_dict)
+        if lock_free_reads != self.__lock_free_reads:
+            object.__setattr__(self, '_DictObj__lock_free_reads', lock_free_reads)
 
-        if any(map(lambda key: not isinstance(key, str),
-                   in_dict.keys())):
-            raise ValueError('input dict for DictObj/FinalDictObj must have only string keys')
+        if lazy:
+            _init_hidden_data(self, dict(in_dict), lazy=True)
+        else:
+            # every node is copied exactly once, leaves share one memo like copy.deepcopy(in_dict) does
+            memo: Dict[int, Any] = {}
+            _init_hidden_data(self, {key: self._create_obj_or_keep(val, memo=memo, parent=self)
+                                     for key, val in in_dict.items()})
+
+    @classmethod
+    def _from_plain(cls, in_dict: Dict, lazy: bool, lock_free_reads: bool, lock_policy: str) -> 'DictObj':
+        """rebuild an instance pickled by __reduce__, without calling __init__ which subclasses may change"""
+        obj = cls.__new__(cls)
+        obj._init_dict_obj(in_dict, lazy=lazy, lock_free_reads=lock_free_reads, lock_policy=lock_policy)
+        return obj
+
+    def __reduce__(self):
+        """
+        pickle as plain data and options, locks are skipped, and the tree is rebuilt in one pass when unpickled,
+        views are pickled as ordinary DictObj
+        """
+        return self._from_plain, (self.to_dict(), self.__lazy, self.__lock_free_reads, self.__lock_policy)
 
-        for key, val in in_dict.items():
-            in_dict[key] = self._create_obj_or_keep(val)
+    @classmethod
+    def _from_hidden_data(cls, data: Dict, lazy: bool = False, parent: Optional['DictObj'] = None) -> 'DictObj':
+        """create instance over already converted hidden data, neither copying it nor calling __init__"""
+        obj = cls.__new__(cls)
+        _init_hidden_data(obj, data, lazy=lazy, parent=parent)
+        return obj
 
-        super(DictObj, self).__init__(**in_dict)
+    @classmethod
+    def view(cls, in_dict: Dict, copy_on_write: bool = False) -> 'DictObj':
+        """
+        Wrap in_dict without copying it, attribute/item reads go straight to in_dict,
+        nested dicts/lists are wrapped as views when they are accessed.
+        :param copy_on_write: if False, modifications are written through to in_dict (and its nested dicts/lists);
+                              if True, in_dict is shallow-copied before the first modification and never touched,
+                              reading a nested list also takes the copy, for the converted list has to be kept
+        """
+        _validate_dict_obj_keys(in_dict)
+
+        obj = cls._from_hidden_data(in_dict)
+        object.__setattr__(obj, '_DictObj__view_mode', _COPY_ON_WRITE if copy_on_write else _WRITE_THROUGH)
+        object.__setattr__(obj, '_DictObj__view_children', {})
+        return obj
+
+    @classmethod
+    def _from_json_object(cls, data: Dict) -> 'DictObj':
+        """object_hook for json, data is freshly decoded and owned by us, so it's used as hidden data directly"""
+        return cls._from_hidden_data(data)
+
+    @classmethod
+    def _from_json_value(cls, value) -> 'DictObj':
+        if not isinstance(value, cls):
+            raise ValueError(f'JSON document for {cls.__name__} must be an object, but got {type(value).__name__}')
+        return value
 
     @classmethod
-    def _create_obj_or_keep(cls, data):
+    def from_json(cls, source: Union[str, bytes, bytearray, IO]) -> 'DictObj':
+        """
+        Build DictObj directly while parsing JSON, without the extra copy of DictObj(json.loads(...))
+        :param source: JSON document in str/bytes, or a file-like object to read from
+        """
+        if isinstance(source, (str, bytes, bytearray)):
+            value = json.loads(source, object_hook=cls._from_json_object)
+        else:
+            value = json.load(source, object_hook=cls._from_json_object)
+        return cls._from_json_value(value)
+
+    @classmethod
+    def from_json_lines(cls, source: Union[str, bytes, bytearray, Iterable]) -> Iterator['DictObj']:
+        """
+        Build DictObj for each line of JSON Lines one at a time, blank lines are skipped
+        :param source: JSON Lines in str/bytes, or a file-like object/iterable of lines,
+                       lines are read only when the records are consumed
+        """
+        lines = _iter_lines(source) if isinstance(source, (str, bytes, bytearray)) else source
+        for line in lines:
+            if line.strip():
+                yield cls._from_json_value(json.loads(line, object_hook=cls._from_json_object))
+
+    @classmethod
+    def _create_obj_or_keep(cls, data, lazy=False, memo=None, parent=None):
+        """
+        Convert dicts to DictObj and lists/tuples to list, dicts are always copied,
+        other leaves are deep-copied only when memo is given
+        """
+        if isinstance(data, dict):
+            _validate_dict_obj_keys(data)
+            if lazy:
+                return cls._from_hidden_data(dict(data), lazy=True, parent=parent)
+            memo = {} if memo is None else memo
+            return cls._from_hidden_data({key: cls._create_obj_or_keep(val, memo=memo, parent=parent)
+                                          for key, val in data.items()}, parent=parent)
+        elif isinstance(data, (list, tuple)):
+            return list(cls._create_obj_or_keep(x, lazy=lazy, memo=memo, parent=parent) for x in data)
+        elif memo is None or type(data) in _IMMUTABLE_LEAF_TYPES:
+            return data
+        else:
+            return copy.deepcopy(data, memo)
+
+    @classmethod
+    def _create_view_or_keep(cls, data, copy_on_write=False):
         if isinstance(data, dict):
-            return cls(data)
+            return cls.view(data, copy_on_write=copy_on_write)
         elif isinstance(data, (list, tuple)):
-            return list(cls._create_obj_or_keep(x) for x in data)
+            if copy_on_write:
+                return list(cls._create_view_or_keep(x, copy_on_write=True) for x in data)
+            return _ListView(data, cls._create_view_or_keep)
         else:
             return data
 
-    @method_synchronized
+    @_synchronized
+    def _get_view_item(self, key):
+        data = self._user_dict_hidden_data
+        val = data[key]
+        if isinstance(val, dict):
+            # keep nested views, so that modifications in copy-on-write views are not lost
+            children = self.__view_children
+            entry = children.get(key)
+            if entry is None or entry[0] is not val:
+                entry = (val, self._create_view_or_keep(val, copy_on_write=self.__view_mode == _COPY_ON_WRITE))
+                children[key] = entry
+            return entry[1]
+        elif isinstance(val, (list, tuple)):
+            if self.__view_mode == _COPY_ON_WRITE:
+                self._detach()
+                return self[key]
+            return self._create_view_or_keep(val)
+        return val
+
+    @_synchronized
+    def _detach(self):
+        """copy-on-write views take a shallow copy of the wrapped dict before the first modification"""
+        if self.__view_mode != _COPY_ON_WRITE:
+            return
+        data = dict(self._user_dict_hidden_data)
+        pending_keys = {key for key, val in data.items() if isinstance(val, (dict, list, tuple))}
+        for key, (val, child) in self.__view_children.items():
+            if data.get(key) is val:
+                data[key] = child
+                pending_keys.discard(key)
+        object.__setattr__(self, '_user_dict_hidden_data', data)
+        object.__setattr__(self, '_DictObj__lazy', True)
+        object.__setattr__(self, '_DictObj__pending_keys', pending_keys)
+        object.__setattr__(self, '_DictObj__view_mode', None)
+        object.__setattr__(self, '_DictObj__view_children', {})
+
+    @_synchronized
+    def _store(self, key, item):
+        __dict__ = object.__getattribute__(self, '__dict__')
+        view_mode = __dict__.get('_DictObj__view_mode')
+        if view_mode == _WRITE_THROUGH:
+            __dict__['_user_dict_hidden_data'][key] = item
+            __dict__['_DictObj__view_children'].pop(key, None)
+            return
+        if view_mode is not None:
+            self._detach()
+        cls = type(self)
+        data = __dict__['_user_dict_hidden_data']
+        if __dict__.get('_DictObj__lock_free_reads', cls._DictObj__lock_free_reads):
+            data = dict(data)
+        data[key] = cls._create_obj_or_keep(item, lazy=__dict__.get('_DictObj__lazy', False), parent=self)
+        # publish the new data before discarding the pending key, see __getitem__
+        __dict__['_user_dict_hidden_data'] = data
+        pending_keys = __dict__.get('_DictObj__pending_keys')
+        if pending_keys:
+            pending_keys.discard(key)
+
+    @_synchronized
+    def _materialize(self, key):
+        """convert the raw nested dict/list stored under key in lazy mode, return the converted value"""
+        data = self._user_dict_hidden_data
+        if key in self.__pending_keys:
+            # replacing the value of an existing key in place is safe for lock-free readers
+            data[key] = self._create_obj_or_keep(data[key], lazy=True, parent=self)
+            self.__pending_keys.discard(key)
+        return data[key]
+
+    @_synchronized
+    def _materialize_all(self):
+        for key in list(self.__pending_keys):
+            self._materialize(key)
+
+    def __getitem__(self, key):
+        __dict__ = object.__getattribute__(self, '__dict__')
+        if __dict__.get('_DictObj__view_mode') is not None:
+            return self._get_view_item(key)
+        pending_keys = __dict__.get('_DictObj__pending_keys')
+        if pending_keys and key in pending_keys:
+            return self._materialize(key)
+        # read hidden data only once, it may be swapped by writers in lock-free-read mode
+        data = __dict__['_user_dict_hidden_data']
+        if key in data:
+            return data[key]
+        return super(DictObj, self).__getitem__(key)
+
+    def keys(self):
+        if self.__lock_free_reads and self.__view_mode is None:
+            return self._user_dict_hidden_data.keys()
+        return super(DictObj, self).keys()
+
+    def items(self):
+        if self.__lock_free_reads and self.__view_mode is None:
+            self._materialize_all()
+            return self._user_dict_hidden_data.items()
+        return super(DictObj, self).items()
+
+    def values(self):
+        if self.__lock_free_reads and self.__view_mode is None:
+            self._materialize_all()
+            return self._user_dict_hidden_data.values()
+        return super(DictObj, self).values()
+
     def __setitem__(self, key, item):
-        self._user_dict_hidden_data[key] = self._create_obj_or_keep(item)
+        # _store holds the lock
+        type(self)._store(self, key, item)
 
-    @method_synchronized
+    @_synchronized
     def popitem(self):
         """
         Override popitem from MutableMapping, make behavior popitem FILO like ordinary dict since 3.6
         """
-        return self._user_dict_hidden_data.popitem()
-
-    @method_synchronized
+        self._detach()
+        data = self._user_dict_hidden_data
+        if self.__lock_free_reads:
+            data = dict(data)
+        key, val = data.popitem()
+        object.__setattr__(self, '_user_dict_hidden_data', data)
+        if key in self.__pending_keys:
+            self.__pending_keys.discard(key)
+            val = self._create_obj_or_keep(val, lazy=True, parent=self)
+        elif self.__view_mode is not None:
+            self.__view_children.pop(key, None)
+            val = self._create_view_or_keep(val)
+        return key, val
+
+    @_synchronized
     def pop(self, key):
-        val = self._user_dict_hidden_data[key]
-        del self._user_dict_hidden_data[key]
+        val = self[key]
+        del self[key]
         return val
 
-    @method_synchronized
+    @_read_synchronized
     def __getattribute__(self, item):
-        if item in {'_user_dict_hidden_data'}:
+        if item == '_user_dict_hidden_data':
             return object.__getattribute__(self, '__dict__')[item]
         else:
             return super(DictObj, self).__getattribute__(item)
 
-    @method_synchronized
+    @_synchronized
     def __delitem__(self, key):
-        del self._user_dict_hidden_data[key]
+        self._detach()
+        data = self._user_dict_hidden_data
+        if self.__lock_free_reads:
+            data = dict(data)
+        del data[key]
+        object.__setattr__(self, '_user_dict_hidden_data', data)
+        if self.__pending_keys:
+            self.__pending_keys.discard(key)
+        if self.__view_mode is not None:
+            self.__view_children.pop(key, None)
 
-    @method_synchronized
     def __setattr__(self, key, value):
         """DictObj that can change attribute"""
         if key == '_user_dict_hidden_data':
@@ -296,27 +718,29 @@ class DictObj(_MyUserDict):
                 # handle case when accessing attribute directly
                 # by adding '_' for keyword/non-identifier attribute
                 key = key[1:]
-            cls_name = object.__getattribute__(self, '__class__').__name__
-            data[key] = self._create_obj_or_keep(value)
-            object.__setattr__(self, '_user_dict_hidden_data', data)
+            # _store holds the lock
+            type(self)._store(self, key, value)
 
-    @method_synchronized
+    @_read_synchronized
     def __getattr__(self, item):
         __dict__ = object.__getattribute__(self, '__dict__')
         try:
-            return __dict__['_user_dict_hidden_data'][item]
-        except KeyError:
+            # plain DictObj (neither lazy with pending keys nor a view) are read straight from the hidden data,
+            # the flags are checked before reading the data, see _materialize and _detach
+            plain = __dict__.get('_DictObj__view_mode') is None and not __dict__.get('_DictObj__pending_keys')
+            data = __dict__['_user_dict_hidden_data']
+            if item in data:
+                return data[item] if plain else self[item]
             if len(item) >= 2 and item.startswith('_') and not item.startswith('__'):
                 # keyword like attribute can be accessed by adding "_" in prefix
                 new_item = item[1:]
-                if new_item.isidentifier() is False or iskeyword(new_item):
-                    try:
-                        return __dict__['_user_dict_hidden_data'][new_item]
-                    except KeyError:
-                        pass
-            raise AttributeError(f'AttributeError {item}')
+                if (new_item.isidentifier() is False or iskeyword(new_item)) and new_item in data:
+                    return data[new_item] if plain else self[new_item]
+        except KeyError:
+            pass
+        raise AttributeError(f'AttributeError {item}')
 
-    @method_synchronized
+    @_synchronized
     def __delattr__(self, item):
         try:
             del self[item]
@@ -334,29 +758,69 @@ class DictObj(_MyUserDict):
 
     def __eq__(self, other: 'DictObj') -> bool:
         if isinstance(other, DictObj):
+            if self.__view_mode is not None or other.__view_mode is not None:
+                return self.to_dict() == other.to_dict()
+            self._materialize_all()
+            other._materialize_all()
             return self._user_dict_hidden_data == other._user_dict_hidden_data
-        return False
+        return NotImplemented
 
     def __hash__(self):
         """not hashable"""
         return None
 
-    @method_synchronized
+    def __repr__(self):
+        if self.__view_mode is not None:
+            return repr(self.to_dict())
+        self._materialize_all()
+        return super(DictObj, self).__repr__()
+
+    @_synchronized
     def __copy__(self):
-        my_copy = type(self)({})
-        my_copy._user_dict_hidden_data = copy.copy(self._user_dict_hidden_data)
+        if self.__view_mode == _WRITE_THROUGH:
+            return type(self).view(copy.copy(self._user_dict_hidden_data))
+        self._detach()
+        self._materialize_all()
+        my_copy = type(self)._from_hidden_data(copy.copy(self._user_dict_hidden_data), parent=self)
+        if self.__lock_policy == 'shared':
+            # the copy is an independent tree with its own lock, nodes added to it later inherit the new lock
+            _apply_lock_policy(my_copy, 'shared')
+        object.__setattr__(my_copy, '_DictObj__lazy', self.__lazy)
         return my_copy
 
-    @method_synchronized
+    @_synchronized
     def __deepcopy__(self, memo=None):
         if memo is None:
             memo = {}
-        my_copy = type(self)({})
-        my_copy._user_dict_hidden_data = copy.deepcopy(self._user_dict_hidden_data, memo)
+        if self.__view_mode == _WRITE_THROUGH:
+            return type(self).view(copy.deepcopy(self._user_dict_hidden_data, memo))
+        self._detach()
+        my_copy = type(self)._from_hidden_data({}, parent=self)
+        if self.__lock_policy == 'shared':
+            # one new lock for the whole copied tree, nested nodes find it in memo by the id of the source lock
+            source_lock = object.__getattribute__(self, '__dict__')[_lock_slot_name(self)]
+            lock = memo.get(id(source_lock))
+            if lock is None:
+                lock = memo[id(source_lock)] = threading.RLock()
+            _apply_lock_policy(my_copy, 'shared', lock)
+        memo[id(self)] = my_copy
+        object.__setattr__(my_copy, '_user_dict_hidden_data', copy.deepcopy(self._user_dict_hidden_data, memo))
+        if self.__lazy:
+            # raw values of pending keys are deep-copied as they are, and converted on first access
+            object.__setattr__(my_copy, '_DictObj__lazy', True)
+            object.__setattr__(my_copy, '_DictObj__pending_keys', set(self.__pending_keys))
         return my_copy
 
-    @method_synchronized
+    @_read_synchronized
     def to_dict(self, flatten=True):
+        if self.__view_mode is not None:
+            children = self.__view_children
+            result = {}
+            for key, item in self._user_dict_hidden_data.items():
+                entry = children.get(key)
+                result[key] = entry[1].to_dict() if entry is not None and entry[0] is item else _to_plain(item)
+            return result
+        self._materialize_all()
         result = {}
         for key, item in self._user_dict_hidden_data.items():
             if isinstance(item, (list, tuple)):
@@ -369,6 +833,53 @@ class DictObj(_MyUserDict):
         return result
 
 
+# canonical instances of interned FinalDictObj, see FinalDictObj.__init__
+_interned_final_dict_objs: 'weakref.WeakValueDictionary[Tuple, FinalDictObj]' = weakref.WeakValueDictionary()
+_interned_final_dict_objs_lock = threading.Lock()
+
+
+def _intern_key(value) -> Tuple:
+    """
+    key for interning, type-aware all the way down, for 1 == 1.0 == True would otherwise share one subtree,
+    nested FinalDictObj are interned before their parents, so their keys are taken from the cache
+    """
+    if isinstance(value, FinalDictObj):
+        key = object.__getattribute__(value, '__dict__').get('_FinalDictObj__intern_key')
+        if key is None:
+            key = (type(value), frozenset((k, _intern_key(v)) for k, v in value.items()))
+        return key
+    if isinstance(value, tuple):
+        return tuple, tuple(_intern_key(x) for x in value)
+    return type(value), value
+
+
+def _intern_final_dict_obj(obj: 'FinalDictObj') -> 'FinalDictObj':
+    """
+    return the canonical instance equal to obj, obj itself becomes the canonical one if there is none,
+    subtrees with unhashable leaves (e.g. sets) are left un-interned
+    """
+    try:
+        key = _intern_key(obj)
+    except TypeError:
+        return obj
+    with _interned_final_dict_objs_lock:
+        canonical = _interned_final_dict_objs.get(key)
+        if canonical is None:
+            _interned_final_dict_objs[key] = canonical = obj
+            object.__setattr__(obj, '_FinalDictObj__intern_key', key)
+    return canonical
+
+
+# size of the pickled payload in shared memory, see FinalDictObj.to_shared_memory
+_SHARED_MEMORY_HEADER = struct.Struct('<Q')
+
+
+def _lists_to_tuples(data):
+    if isinstance(data, list):
+        return tuple(_lists_to_tuples(x) for x in data)
+    return data
+
+
 def _frozen_checker(func):
     @functools.wraps(func)
     def wrapper(self, *args, **kwargs):
@@ -382,42 +893,149 @@ def _frozen_checker(func):
 class FinalDictObj(DictObj):
     __is_frozen = False
     __frozen_err_msg = 'Cannot modify attribute/item in an already initialized FinalDictObj'
+    # nothing is modified after initialization (except converting pending keys in lazy mode), reads need no lock
+    _DictObj__lock_free_reads = True
+    __intern = False
 
-    def __init__(self, in_dict: Dict):
-        in_dict = copy.deepcopy(in_dict)
-        super(FinalDictObj, self).__init__(in_dict)
+    def __init__(self, in_dict: Dict, lazy: bool = False, lock_free_reads: bool = True,
+                 lock_policy: str = 'instance', intern: bool = False):
+        """
+        see DictObj.__init__
+        :param intern: if True, nested FinalDictObj are interned, identical subtrees (also of other interned
+                       FinalDictObj) share one instance, cannot be used with lazy
+        """
+        if intern:
+            if lazy:
+                raise ValueError('intern cannot be used together with lazy')
+            object.__setattr__(self, '_FinalDictObj__intern', True)
+        super(FinalDictObj, self).__init__(in_dict, lazy=lazy, lock_free_reads=lock_free_reads,
+                                           lock_policy=lock_policy)
         self._freeze()
 
     @classmethod
-    def _create_obj_or_keep(cls, data):
+    def _from_hidden_data(cls, data: Dict, lazy: bool = False, parent: Optional[DictObj] = None) -> 'FinalDictObj':
+        obj = super(FinalDictObj, cls)._from_hidden_data(data, lazy=lazy, parent=parent)
+        object.__setattr__(obj, '_FinalDictObj__is_frozen', True)
+        return obj
+
+    @classmethod
+    def _from_plain(cls, in_dict: Dict, lazy: bool, lock_free_reads: bool, lock_policy: str) -> 'FinalDictObj':
+        obj = super(FinalDictObj, cls)._from_plain(in_dict, lazy, lock_free_reads, lock_policy)
+        object.__setattr__(obj, '_FinalDictObj__is_frozen', True)
+        return obj
+
+    def to_shared_memory(self, name: Optional[str] = None) -> 'multiprocessing.shared_memory.SharedMemory':
+        """
+        Publish this FinalDictObj into multiprocessing.shared_memory once,
+        so that worker processes only need the name to load it with FinalDictObj.from_shared_memory,
+        instead of receiving a pickled copy with every task.
+        The caller owns the returned SharedMemory, close() and unlink() it when workers are done.
+        """
+        from multiprocessing.shared_memory import SharedMemory
+
+        payload = pickle.dumps(self, protocol=pickle.HIGHEST_PROTOCOL)
+        shm = SharedMemory(name=name, create=True, size=_SHARED_MEMORY_HEADER.size + len(payload))
+        _SHARED_MEMORY_HEADER.pack_into(shm.buf, 0, len(payload))
+        shm.buf[_SHARED_MEMORY_HEADER.size:_SHARED_MEMORY_HEADER.size + len(payload)] = payload
+        return shm
+
+    @classmethod
+    def from_shared_memory(cls, name: str) -> 'FinalDictObj':
+        """load FinalDictObj published by FinalDictObj.to_shared_memory, read straight from the shared buffer"""
+        from multiprocessing.shared_memory import SharedMemory
+
+        shm = SharedMemory(name=name)
+        try:
+            size, = _SHARED_MEMORY_HEADER.unpack_from(shm.buf, 0)
+            payload = shm.buf[_SHARED_MEMORY_HEADER.size:_SHARED_MEMORY_HEADER.size + size]
+            try:
+                obj = pickle.loads(payload)
+            finally:
+                payload.release()
+        finally:
+            shm.close()
+        if not isinstance(obj, cls):
+            raise TypeError(f'{repr(name)} does not hold a {cls.__name__}')
+        return obj
+
+    @classmethod
+    def view(cls, in_dict: Dict, copy_on_write: bool = False) -> 'FinalDictObj':
+        """
+        Wrap in_dict without copying it, see DictObj.view, copy_on_write makes no difference for FinalDictObj.
+        Nested lists are converted to tuples each time they are accessed
+        """
+        return super(FinalDictObj, cls).view(in_dict)
+
+    @classmethod
+    def _create_obj_or_keep(cls, data, lazy=False, memo=None, parent=None):
+        if isinstance(data, dict):
+            obj = super(FinalDictObj, cls)._create_obj_or_keep(data, lazy=lazy, memo=memo, parent=parent)
+            if parent is not None and object.__getattribute__(parent, '_FinalDictObj__intern'):
+                obj = _intern_final_dict_obj(obj)
+            return obj
+        elif isinstance(data, (list, tuple)):
+            return tuple(cls._create_obj_or_keep(x, lazy=lazy, memo=memo, parent=parent) for x in data)
+        else:
+            return super(FinalDictObj, cls)._create_obj_or_keep(data, memo=memo)
+
+    @classmethod
+    def _from_json_object(cls, data: Dict) -> 'FinalDictObj':
+        for key, val in data.items():
+            if isinstance(val, list):
+                data[key] = _lists_to_tuples(val)
+        return super(FinalDictObj, cls)._from_json_object(data)
+
+    @classmethod
+    def _create_view_or_keep(cls, data, copy_on_write=False):
         if isinstance(data, dict):
-            return cls(data)
+            return cls.view(data)
         elif isinstance(data, (list, tuple)):
-            return tuple(cls._create_obj_or_keep(x) for x in data)
+            return tuple(cls._create_view_or_keep(x) for x in data)
         else:
             return data
 
-    @method_synchronized
+    @_synchronized
     def _freeze(self):
         self.__is_frozen = True
 
-    @method_synchronized
+    def __hash__(self):
+        """structural hash, computed once and cached, views are not hashable for the wrapped dict may change"""
+        __dict__ = object.__getattribute__(self, '__dict__')
+        hash_val = __dict__.get('_FinalDictObj__hash')
+        if hash_val is None:
+            if self._DictObj__view_mode is not None:
+                raise TypeError(f'unhashable type: {type(self).__name__} view')
+            hash_val = hash(frozenset(self.items()))
+            object.__setattr__(self, '_FinalDictObj__hash', hash_val)
+        return hash_val
+
+    def __eq__(self, other: object) -> bool:
+        if self is other:
+            return True
+        if isinstance(other, FinalDictObj):
+            hash_val = object.__getattribute__(self, '__dict__').get('_FinalDictObj__hash')
+            other_hash_val = object.__getattribute__(other, '__dict__').get('_FinalDictObj__hash')
+            if hash_val is not None and other_hash_val is not None and hash_val != other_hash_val:
+                return False
+        return super(FinalDictObj, self).__eq__(other)
+
+    @_synchronized
     @_frozen_checker
     def __setitem__(self, key, value):
         """DictObj that cannot change attribute"""
         super(FinalDictObj, self).__setitem__(key, value)
 
-    @method_synchronized
+    @_synchronized
     @_frozen_checker
     def __delitem__(self, key):
         super(FinalDictObj, self).__delitem__(key)
 
-    @method_synchronized
+    @_synchronized
     @_frozen_checker
     def popitem(self):
         return super(FinalDictObj, self).popitem()
 
-    @method_synchronized
+    @_synchronized
     @_frozen_checker
     def pop(self, key):
         return super(FinalDictObj, self).pop(key)
@@ -432,36 +1050,178 @@ class FinalDictObj(DictObj):
 
             super(FinalDictObj, self).__setattr__(key, value)
 
-    @method_synchronized
+    @_synchronized
     @_frozen_checker
     def __delattr__(self, item):
         super(FinalDictObj, self).__delattr__(item)
 
-    @method_synchronized
+    @_synchronized
     @_frozen_checker
     def update(self, *args, **kwargs):
         super(FinalDictObj, self).update(*args, **kwargs)
 
-    @method_synchronized
+
+class _KeyTable(dict):
+    """key -> index of values, shared by all CompactFinalDictObj of the same shape"""
+    __slots__ = ('__weakref__',)
+
+
+_key_tables: 'weakref.WeakValueDictionary[Tuple[str, ...], _KeyTable]' = weakref.WeakValueDictionary()
+_key_tables_lock = threading.Lock()
+
+
+def _intern_key_table(keys: Tuple[str, ...]) -> _KeyTable:
+    key_table = _key_tables.get(keys)
+    if key_table is None:
+        with _key_tables_lock:
+            key_table = _key_tables.get(keys)
+            if key_table is None:
+                key_table = _KeyTable((key, idx) for idx, key in enumerate(keys))
+                _key_tables[keys] = key_table
+    return key_table
+
+
+class CompactFinalDictObj(Mapping):
+    """
+    Compact version of FinalDictObj for large amounts of records with the same keys.
+    Records of the same shape share one interned key table, and keep only a tuple of values,
+    without instance __dict__, hidden dict or locks (nothing is modified after initialization).
+    Nested dicts are converted to CompactFinalDictObj, lists to tuples.
+    """
+    __slots__ = ('__key_table', '__values', '__hash')
+    __frozen_err_msg = 'Cannot modify attribute/item in an already initialized CompactFinalDictObj'
+
+    def __init__(self, in_dict: Dict):
+        self._init_from_dict(in_dict, memo={})
+
+    def _init_from_dict(self, in_dict: Dict, memo: Dict[int, Any]) -> None:
+        _validate_dict_obj_keys(in_dict)
+        object.__setattr__(self, '_CompactFinalDictObj__key_table', _intern_key_table(tuple(in_dict)))
+        object.__setattr__(self, '_CompactFinalDictObj__values',
+                           tuple(self._create_obj_or_keep(val, memo) for val in in_dict.values()))
+
+    @classmethod
+    def _from_key_values(cls, keys: Tuple[str, ...], values: Tuple) -> 'CompactFinalDictObj':
+        obj = cls.__new__(cls)
+        object.__setattr__(obj, '_CompactFinalDictObj__key_table', _intern_key_table(keys))
+        object.__setattr__(obj, '_CompactFinalDictObj__values', values)
+        return obj
+
+    @classmethod
+    def _create_obj_or_keep(cls, data, memo: Dict[int, Any]):
+        if isinstance(data, dict):
+            obj = cls.__new__(cls)
+            obj._init_from_dict(data, memo)
+            return obj
+        elif isinstance(data, (list, tuple)):
+            return tuple(cls._create_obj_or_keep(x, memo) for x in data)
+        elif type(data) in _IMMUTABLE_LEAF_TYPES:
+            return data
+        else:
+            return copy.deepcopy(data, memo)
+
+    def __getitem__(self, key):
+        return self.__values[self.__key_table[key]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__key_table)
+
+    def __len__(self) -> int:
+        return len(self.__values)
+
+    def __contains__(self, key) -> bool:
+        return key in self.__key_table
+
+    def __getattr__(self, item):
+        if item.startswith('_CompactFinalDictObj__'):
+            # slots not set yet
+            raise AttributeError(f'AttributeError {item}')
+        key_table = self.__key_table
+        if item in key_table:
+            return self.__values[key_table[item]]
+        if len(item) >= 2 and item.startswith('_') and not item.startswith('__'):
+            # keyword like attribute can be accessed by adding "_" in prefix
+            new_item = item[1:]
+            if (new_item.isidentifier() is False or iskeyword(new_item)) and new_item in key_table:
+                return self.__values[key_table[new_item]]
+        raise AttributeError(f'AttributeError {item}')
+
+    def __setattr__(self, key, value):
+        raise RuntimeError(self.__frozen_err_msg)
+
+    def __delattr__(self, item):
+        raise RuntimeError(self.__frozen_err_msg)
+
+    def __setitem__(self, key, value):
+        raise RuntimeError(self.__frozen_err_msg)
+
+    def __delitem__(self, key):
+        raise RuntimeError(self.__frozen_err_msg)
+
+    def pop(self, key):
+        raise RuntimeError(self.__frozen_err_msg)
+
+    def popitem(self):
+        raise RuntimeError(self.__frozen_err_msg)
+
+    def update(self, *args, **kwargs):
+        raise RuntimeError(self.__frozen_err_msg)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, CompactFinalDictObj):
+            if self.__key_table is other.__key_table:
+                return self.__values == other.__values
+            return dict(zip(self.__key_table, self.__values)) == dict(zip(other.__key_table, other.__values))
+        if isinstance(other, DictObj):
+            return self.to_dict() == other.to_dict()
+        return False
+
+    def __hash__(self):
+        """structural hash like FinalDictObj.__hash__, so equal FinalDictObj and CompactFinalDictObj hash equally"""
+        try:
+            return self.__hash
+        except AttributeError:
+            hash_val = hash(frozenset(zip(self.__key_table, self.__values)))
+            object.__setattr__(self, '_CompactFinalDictObj__hash', hash_val)
+            return hash_val
+
+    def __repr__(self):
+        return repr(dict(zip(self.__key_table, self.__values)))
+
     def __copy__(self):
-        my_copy = type(self)({})
-        my_copy._FinalDictObj__is_frozen = False
-        my_copy._user_dict_hidden_data = copy.copy(self._user_dict_hidden_data)
-        my_copy._FinalDictObj__is_frozen = True
-        return my_copy
+        return self._from_key_values(tuple(self.__key_table), self.__values)
 
-    @method_synchronized
     def __deepcopy__(self, memo=None):
-        if memo is None:
-            memo = {}
-        my_copy = type(self)(copy.deepcopy(self.to_dict(), memo))
-        return my_copy
+        return self._from_key_values(tuple(self.__key_table), copy.deepcopy(self.__values, memo))
+
+    def __reduce__(self):
+        return self._from_key_values, (tuple(self.__key_table), self.__values)
+
+    def to_dict(self, flatten=True):
+        result = {}
+        for key, item in zip(self.__key_table, self.__values):
+            if isinstance(item, tuple):
+                result[key] = [x.to_dict() if hasattr(x, 'to_dict') and callable(getattr(x, 'to_dict')) else x
+                               for x in item]
+            elif isinstance(item, CompactFinalDictObj) and flatten:
+                result[key] = item.to_dict()
+            else:
+                result[key] = item
+        return result
+
+
+# range of boundaries saved as 'q' by RangeKeyDict.save
+_INT64_MIN, _INT64_MAX = -(1 << 63), (1 << 63) - 1
+
+# marks keys not in any range in the table of RangeKeyDict.compile_dense
+_DENSE_MISSING = object()
 
 
 class RangeKeyDict(Generic[KT, VT]):
     """
     RangeKeyDict uses tuple of key pairs to present range keys, notice that the range is left-closed/right-open
-    [min, max): min <= key < max, Big O of querying is O(log n), n is the number of ranges, due to using bisect inside
+    [min, max): min <= key < max, Big O of querying is O(log n), n is the number of ranges,
+    due to using bisect on boundaries computed once when initializing
     """
 
     class Segment(namedtuple('Segment', ['begin', 'end', 'val'])):
@@ -486,30 +1246,151 @@ class RangeKeyDict(Generic[KT, VT]):
         # input validation and generate inner-used structures
         single_point_map, left_boundary_map, sorted_segments = self._gen_inner_structures_and_validate_inputs(
             input_dict)
+        self._set_inner_structures(single_point_map, left_boundary_map, sorted_segments,
+                                   [segment.begin for segment in sorted_segments],
+                                   [segment.end for segment in sorted_segments])
 
+    def _set_inner_structures(self, single_point_map: Dict[KT, VT], left_boundary_map: Dict[KT, Segment],
+                              sorted_segments: List[Segment], begins: List[KT], ends: List[KT]) -> None:
         self._single_point_map = single_point_map
         self._left_boundary_segment_map = left_boundary_map
         self._sorted_segments = sorted_segments
+        # boundaries are built once here, so that each query is a bisect only
+        self._begins = begins
+        self._ends = ends
+        # numpy arrays of begins/ends/values, built on first use by lookup_array
+        self._arrays: Optional[Tuple[Any, Any, Any]] = None
+        # (first key, last key + 1, values) built by compile_dense
+        self._dense: Optional[Tuple[int, int, List[Any]]] = None
+
+    @classmethod
+    def from_sorted(cls, iterable: Iterable[Tuple[KT, KT, VT]]) -> 'RangeKeyDict[KT, VT]':
+        """
+        Build from (begin, end, value) tuples already sorted by begin, e.g. streamed from a CSV file,
+        begin == end means a single point, overlapping is checked in one linear pass without sorting,
+        and no intermediate dict is built. Unlike __init__, boundary types are not checked one by one,
+        boundaries not comparable with each other are detected when they are compared
+        """
+        single_point_map: Dict[KT, VT] = dict()
+        left_boundary_map: Dict[KT, RangeKeyDict.Segment] = dict()
+        segments: List[RangeKeyDict.Segment] = list()
+        begins: List[KT] = list()
+        ends: List[KT] = list()
+        segment_cls = RangeKeyDict.Segment
+        new_segment = tuple.__new__  # skip the argument parsing of namedtuple.__new__
+        prev = None
+        for row in iterable:
+            begin, end, val = row
+            segment = new_segment(segment_cls, (begin, end, val))
+            try:
+                is_single_point = begin == end
+                is_valid = (is_single_point or begin < end) and isinstance(begin, Hashable)
+                if prev is None:
+                    is_duplicated = is_unsorted = is_overlapped = False
+                else:
+                    prev_begin, prev_end = prev[0], prev[1]
+                    is_duplicated = prev_begin == begin
+                    is_unsorted = begin < prev_begin
+                    is_overlapped = prev_end > begin or prev_begin == prev_end == begin
+            except TypeError:
+                is_valid = False
+            if not is_valid:
+                raise ValueError(f'Invalid begin/end pairs detected for {str(segment)}, '
+                                 f'left boundary key must <= right boundary key, and both of them must be '
+                                 f'hashable, comparable with other keys')
+            if is_duplicated:
+                raise ValueError(f'Duplicated left boundary key {repr(begin)} detected: {str(prev)}, {str(segment)}')
+            if is_unsorted:
+                raise ValueError(f'Input is not sorted by begin: {str(prev)}, {str(segment)}')
+            if is_overlapped:
+                raise ValueError(f'Overlap detected: {str(prev)}, {str(segment)}')
+
+            left_boundary_map[begin] = segment
+            if is_single_point:
+                single_point_map[begin] = val
+            segments.append(segment)
+            begins.append(begin)
+            ends.append(end)
+            prev = segment
+
+        obj = cls.__new__(cls)
+        obj._set_inner_structures(single_point_map, left_boundary_map, segments, begins, ends)
+        return obj
+
+    def _invalidate_caches(self) -> None:
+        """drop structures derived from segments, called when segments are changed"""
+        self._arrays = None
+        self._dense = None
+
+    def compile_dense(self, domain: Optional[Tuple[int, int]] = None, max_size: int = 1 << 16) -> None:
+        """
+        Build a direct-index lookup table for integer keys in domain [begin, end),
+        so that looking up int keys in domain is a single list index, other keys fall back to bisect.
+        :param domain: integer key range to cover, defaults to the range from the smallest to the largest boundary,
+                       must be given if any boundary is infinite or not a number
+        :param max_size: maximum number of keys in domain, to avoid building huge tables by accident
+        """
+        if domain is None:
+            boundaries = self._begins + self._ends
+            if not boundaries:
+                raise ValueError('Cannot infer domain for an empty RangeKeyDict, please specify domain')
+            try:
+                domain_begin = math.floor(min(boundaries))
+                domain_end = math.floor(max(boundaries)) + 1
+            except (TypeError, ValueError, OverflowError):
+                raise ValueError('Cannot infer domain from boundaries which are not finite numbers, '
+                                 'please specify domain')
+        else:
+            domain_begin, domain_end = domain
+            if not (isinstance(domain_begin, int) and isinstance(domain_end, int) and domain_begin < domain_end):
+                raise ValueError(f'Invalid domain {repr(domain)}, must be (begin, end) integers and begin < end')
+        if domain_end - domain_begin > max_size:
+            raise ValueError(f'Domain [{domain_begin}, {domain_end}) has more than {max_size} keys')
+        self._dense = None
+        table = [self.get(key, _DENSE_MISSING) for key in range(domain_begin, domain_end)]
+        self._dense = domain_begin, domain_end, table
 
     @staticmethod
-    def _gen_inner_structures_and_validate_inputs(input_dict: Dict[Union[Tuple[KT, KT], KT], VT]) -> Tuple[
-        Dict[KT, VT], Dict[KT, Segment], Sequence[Segment]]:
-        def validate_boundary_key_type(boundary_key_lst: List[KT]):
-            if boundary_key_lst:
-                if all(map(lambda x: isinstance(x, numbers.Number), boundary_key_lst)):
-                    # if all the boundaries are numbers, OK
+    def _validate_boundary_key_type(boundary_key_lst: List[KT]) -> None:
+        if boundary_key_lst:
+            if all(map(lambda x: isinstance(x, numbers.Number), boundary_key_lst)):
+                # if all the boundaries are numbers, OK
+                pass
+            else:
+                if not all(map(lambda x: isinstance(x, type(boundary_key_lst[0])), boundary_key_lst)):
+                    all_types = set(map(type, boundary_key_lst))
+                    raise ValueError(
+                        f'All the boundaries must be either all numbers '
+                        f'or of same type, multi types detected: {[tp.__name__ for tp in all_types]}')
+                else:
+                    # one_key = boundary_key_lst[0]
+                    # one_key < one_key
                     pass
+
+    @staticmethod
+    def _parse_key(key: Union[Tuple[KT, KT], KT]) -> Tuple[KT, KT]:
+        """return (left boundary key, right boundary key) for range key or single point key"""
+        if isinstance(key, tuple) and len(key) == 2:
+            left_boundary_key, right_boundary_key = key
+            try:
+                if (isinstance(left_boundary_key, Hashable) and
+                        isinstance(right_boundary_key, Hashable) and
+                        left_boundary_key < right_boundary_key):
+                    return left_boundary_key, right_boundary_key
                 else:
-                    if not all(map(lambda x: isinstance(x, type(boundary_key_lst[0])), boundary_key_lst)):
-                        all_types = set(map(type, boundary_key_lst))
-                        raise ValueError(
-                            f'All the boundaries must be either all numbers '
-                            f'or of same type, multi types detected: {[tp.__name__ for tp in all_types]}')
-                    else:
-                        # one_key = boundary_key_lst[0]
-                        # one_key < one_key
-                        pass
+                    raise ValueError
+            except (TypeError, ValueError):
+                raise ValueError(f'Invalid key for {repr(key)}, '
+                                 f'left boundary key must < right boundary key, '
+                                 f'and both of them must be hashable, have completed comparison methods')
+        elif not isinstance(key, tuple) and isinstance(key, Hashable):
+            return key, key
+        else:
+            raise ValueError(f'Invalid begin/end pairs detected for {repr(key)}')
 
+    @staticmethod
+    def _gen_inner_structures_and_validate_inputs(input_dict: Dict[Union[Tuple[KT, KT], KT], VT]) -> Tuple[
+        Dict[KT, VT], Dict[KT, Segment], Sequence[Segment]]:
         def sort_and_validate_segments_overlap(segment_lst: List[RangeKeyDict.Segment]) -> None:
             # keys overlapping validation
             # sort segments inplace by begin value,end value
@@ -525,25 +1406,12 @@ class RangeKeyDict(Generic[KT, VT]):
         left_boundary_key_segment_map: Dict[KT, RangeKeyDict.Segment] = dict()
         segments: List[RangeKeyDict.Segment] = list()
         for key, val in input_dict.items():
-            if isinstance(key, tuple) and len(key) == 2:
-                left_boundary_key, right_boundary_key = key
-                try:
-                    if (isinstance(left_boundary_key, Hashable) and
-                            isinstance(right_boundary_key, Hashable) and
-                            left_boundary_key < right_boundary_key):
-                        boundary_keys.extend([left_boundary_key, right_boundary_key])
-                    else:
-                        raise ValueError
-                except (TypeError, ValueError):
-                    raise ValueError(f'Invalid key for {repr(key)}, '
-                                     f'left boundary key must < right boundary key, '
-                                     f'and both of them must be hashable, have completed comparison methods')
-            elif not isinstance(key, tuple) and isinstance(key, Hashable):
+            left_boundary_key, right_boundary_key = RangeKeyDict._parse_key(key)
+            if isinstance(key, tuple):
+                boundary_keys.extend([left_boundary_key, right_boundary_key])
+            else:
                 single_point_map[key] = val
                 boundary_keys.append(key)
-                left_boundary_key = right_boundary_key = key
-            else:
-                raise ValueError(f'Invalid begin/end pairs detected for {repr(key)}')
 
             segment = RangeKeyDict.Segment(begin=left_boundary_key, end=right_boundary_key, val=val)
             segments.append(segment)
@@ -555,7 +1423,7 @@ class RangeKeyDict(Generic[KT, VT]):
             else:
                 left_boundary_key_segment_map[left_boundary_key] = segment
 
-        validate_boundary_key_type(boundary_keys)
+        RangeKeyDict._validate_boundary_key_type(boundary_keys)
         sort_and_validate_segments_overlap(segments)
 
         return single_point_map, left_boundary_key_segment_map, segments
@@ -568,23 +1436,27 @@ class RangeKeyDict(Generic[KT, VT]):
                 self._sorted_segments == other._sorted_segments)
 
     def __getitem__(self, number):
+        dense = self._dense
+        if dense is not None and type(number) is int:
+            domain_begin, domain_end, table = dense
+            if domain_begin <= number < domain_end:
+                val = table[number - domain_begin]
+                if val is _DENSE_MISSING:
+                    raise KeyError(f'KeyError: {repr(number)}')
+                return val
         if number in self._single_point_map:
             return self._single_point_map[number]
+        begins, ends = self._begins, self._ends
         try:
-            idx = bisect_left(list(map(attrgetter('begin'), self._sorted_segments)), number)
+            idx = bisect_left(begins, number)
         except TypeError:
             raise KeyError(f'KeyError: {repr(number)} is not comparable with other keys')
         else:
-            if idx == 0:
-                if number in self._sorted_segments[idx]:
-                    return self._sorted_segments[idx].val
-            elif idx == len(self._sorted_segments):
-                if number in self._sorted_segments[-1]:
-                    return self._sorted_segments[-1].val
-            else:
-                for target_idx in (idx - 1, idx):
-                    if number in self._sorted_segments[target_idx]:
-                        return self._sorted_segments[target_idx].val
+            # only the segments around the insertion point may contain number, see Segment.__contains__
+            for target_idx in range(max(idx - 1, 0), min(idx + 1, len(begins))):
+                begin = begins[target_idx]
+                if begin == number or begin < number < ends[target_idx]:
+                    return self._sorted_segments[target_idx].val
             raise KeyError(f'KeyError: {repr(number)}')
 
     def get(self, number, default=None):
@@ -593,6 +1465,640 @@ class RangeKeyDict(Generic[KT, VT]):
         except KeyError:
             return default
 
+    def _iter_segments(self, begin: Optional[KT] = None, end: Optional[KT] = None) -> Iterator[Segment]:
+        """segments overlapping [begin, end) in ascending order, None means unbounded"""
+        if begin is not None and end is not None and not begin < end:
+            raise ValueError(f'Invalid range [{repr(begin)}, {repr(end)}), begin must < end')
+        segments = self._sorted_segments
+        # ends are ascending as well, for segments never overlap
+        idx = 0 if begin is None else bisect_left(self._ends, begin)
+        # index from idx directly, itertools.islice would step through the first idx segments one by one
+        for i in range(idx, len(segments)):
+            segment = segments[i]
+            if end is not None and not segment.begin < end:
+                break
+            if begin is None or begin < segment.end or begin == segment.begin:
+                yield segment
+
+    def items(self, begin: Optional[KT] = None, end: Optional[KT] = None) -> Iterator[
+            Tuple[Union[Tuple[KT, KT], KT], VT]]:
+        """
+        Lazily iterate (key, value) of ranges/single points overlapping [begin, end) in ascending order,
+        keys are in the same form as input dict, begin/end being None means unbounded, O(log n + k)
+        """
+        for segment in self._iter_segments(begin, end):
+            key = segment.begin if segment.begin == segment.end else (segment.begin, segment.end)
+            yield key, segment.val
+
+    def segments_between(self, begin: KT, end: KT) -> Iterator[Segment]:
+        """
+        Lazily iterate segments overlapping [begin, end) in ascending order,
+        boundaries of ranges are clipped to [begin, end), O(log n + k)
+        """
+        for segment in self._iter_segments(begin, end):
+            if segment.begin < begin or end < segment.end:
+                segment = segment._replace(begin=max(segment.begin, begin), end=min(segment.end, end))
+            yield segment
+
+    def gaps(self, begin: KT, end: KT) -> Iterator[Tuple[KT, KT]]:
+        """
+        Lazily iterate sub-ranges (left-closed, right-open) of [begin, end) not covered by any range,
+        single points are not regarded as covering anything, O(log n + k)
+        """
+        cursor = begin
+        for segment in self._iter_segments(begin, end):
+            if segment.begin == segment.end:
+                continue
+            if cursor < segment.begin:
+                yield cursor, segment.begin
+            if cursor < segment.end:
+                cursor = segment.end
+        if cursor < end:
+            yield cursor, end
+
+    def iter_many(self, keys: Iterable[KT], default: Optional[VT] = None) -> Iterator[Optional[VT]]:
+        """
+        Lazy version of get_many, keys are resolved one by one in the given order,
+        ascending keys are resolved by walking along the segments (a merge-walk),
+        the position is searched again by bisect only when a key goes backwards or jumps ahead
+        """
+        single_point_map, segments = self._single_point_map, self._sorted_segments
+        begins, ends = self._begins, self._ends
+        n = len(begins)
+        pos = 0  # number of segments whose begin <= current key
+        for key in keys:
+            if key in single_point_map:
+                yield single_point_map[key]
+                continue
+            try:
+                if pos > 0 and key < begins[pos - 1]:
+                    pos = bisect_right(begins, key, 0, pos - 1)
+                elif pos < n and begins[pos] <= key:
+                    pos += 1
+                    if pos < n and begins[pos] <= key:
+                        pos = bisect_right(begins, key, pos)
+                if pos > 0:
+                    begin = begins[pos - 1]
+                    if begin == key or begin < key < ends[pos - 1]:
+                        yield segments[pos - 1].val
+                        continue
+            except TypeError:
+                # key is not comparable with other keys
+                pass
+            yield default
+
+    def _get_arrays(self):
+        if self._arrays is None:
+            import numpy as np
+
+            begins, ends = np.asarray(self._begins), np.asarray(self._ends)
+            if begins.dtype.kind not in 'iuf' or ends.dtype.kind not in 'iuf':
+                raise TypeError('lookup_array requires all the boundaries to be numbers')
+            vals = [segment.val for segment in self._sorted_segments]
+            values = None
+            value_type = type(vals[0]) if vals else None
+            if value_type in (bool, int, float, complex) and all(type(val) is value_type for val in vals):
+                try:
+                    values = np.asarray(vals)
+                except OverflowError:
+                    # ints beyond int64
+                    pass
+            if values is None or values.dtype.kind not in 'biufc':
+                # any other values are kept as they are, np.asarray would convert mixed types (e.g. 1 to '1'),
+                # and fail on sequences of different lengths
+                values = np.empty(len(vals), dtype=object)
+                for idx, val in enumerate(vals):
+                    values[idx] = val
+            self._arrays = begins, ends, values
+        return self._arrays
+
+    def lookup_array(self, keys, return_indices: bool = False):
+        """
+        Resolve a numeric numpy array (or array-like) of keys at once with numpy.searchsorted, numpy is required.
+        :param keys: numeric keys, boundaries must be numbers as well
+        :param return_indices: if True, return indices of matched ranges (in ascending order of ranges)
+                               instead of values
+        :return: (values or indices, found mask), both in the shape of keys,
+                 indices are -1 where not found, values are undefined where not found
+        """
+        import numpy as np
+
+        keys = np.asarray(keys)
+        if not self._sorted_segments:
+            found = np.zeros(keys.shape, dtype=bool)
+            if return_indices:
+                return np.full(keys.shape, -1, dtype=np.intp), found
+            # no values to take the dtype from, never hand out uninitialized memory
+            return np.full(keys.shape, None, dtype=object), found
+        begins, ends, values = self._get_arrays()
+        indices = np.searchsorted(begins, keys, side='right') - 1
+        candidates = np.maximum(indices, 0)
+        candidate_begins = begins[candidates]
+        found = (indices >= 0) & ((candidate_begins == keys) | (keys < ends[candidates]))
+        if return_indices:
+            return np.where(found, indices, -1), found
+        return values[candidates], found
+
+    def get_many(self, keys: Iterable[KT], default: Optional[VT] = None) -> List[Optional[VT]]:
+        """
+        Get values for keys in one batch, like [self.get(key, default) for key in keys] but faster,
+        sorted keys are resolved in a single merge-walk along the segments,
+        unsorted keys are sorted first, resolved, and returned in the original order
+        """
+        keys = list(keys)
+        try:
+            if all(not cur < prev for prev, cur in zip(keys, keys[1:])):
+                return list(self.iter_many(keys, default))
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+        except TypeError:
+            # keys are not comparable with each other
+            return [self.get(key, default) for key in keys]
+        result: List[Optional[VT]] = [default] * len(keys)
+        for idx, val in zip(order, self.iter_many([keys[idx] for idx in order], default)):
+            result[idx] = val
+        return result
+
+    def save(self, path: Union[str, 'os.PathLike']) -> None:
+        """
+        Compile to a binary file with sorted boundary arrays and a value table, see MappedRangeKeyDict,
+        all the boundaries must be numbers, values must be picklable
+        """
+        begins, ends = self._begins, self._ends
+        boundaries = begins + ends
+        if not all(isinstance(x, numbers.Integral) for x in boundaries):
+            if not all(isinstance(x, numbers.Real) for x in boundaries):
+                raise TypeError('Only RangeKeyDict with numeric boundaries can be saved')
+            try:
+                exact = all(float(x) == x for x in boundaries)
+            except OverflowError:
+                exact = False
+            if not exact:
+                # e.g. large ints mixed with floats, lookups would silently go wrong after rounding
+                raise ValueError('Boundaries of RangeKeyDict with float boundaries must be exactly representable '
+                                 'as 64-bit floats to be saved')
+            boundary_typecode = 'd'
+        else:
+            if not all(_INT64_MIN <= x <= _INT64_MAX for x in boundaries):
+                raise ValueError('Integer boundaries of RangeKeyDict must fit in 64-bit signed integers to be saved')
+            boundary_typecode = 'q'
+
+        # identical values are stored only once
+        value_idx_map: Dict[bytes, int] = {}
+        value_indices = array('q', (value_idx_map.setdefault(pickle.dumps(segment.val), len(value_idx_map))
+                                    for segment in self._sorted_segments))
+        value_offsets = array('q', [0])
+        for value_bytes in value_idx_map:
+            value_offsets.append(value_offsets[-1] + len(value_bytes))
+
+        with open(path, 'wb') as f:
+            f.write(_MAPPED_RANGE_KEY_DICT_HEADER.pack(
+                _MAPPED_RANGE_KEY_DICT_MAGIC, sys.byteorder[0].encode(), boundary_typecode.encode(),
+                len(begins), len(value_idx_map)))
+            f.write(array(boundary_typecode, begins).tobytes())
+            f.write(array(boundary_typecode, ends).tobytes())
+            f.write(value_indices.tobytes())
+            f.write(value_offsets.tobytes())
+            for value_bytes in value_idx_map:
+                f.write(value_bytes)
+
+
+# magic, byte order ('l'/'b'), typecode of boundaries ('q'/'d'), number of segments, number of distinct values
+_MAPPED_RANGE_KEY_DICT_HEADER = struct.Struct('<4sccxxQQ')
+_MAPPED_RANGE_KEY_DICT_MAGIC = b'RKD1'
+
+
+class MappedRangeKeyDict(Generic[KT, VT]):
+    """
+    Read-only RangeKeyDict loaded from the file written by RangeKeyDict.save through mmap, loading is O(1),
+    lookups bisect the mapped boundary arrays directly, and the pages are shared by all the processes mapping
+    the same file. Values are unpickled on first access and cached in each process.
+    Values are unpickled, so never load files from untrusted sources.
+    """
+
+    def __init__(self, path: Union[str, 'os.PathLike']) -> None:
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header_size = _MAPPED_RANGE_KEY_DICT_HEADER.size
+        magic, byte_order, boundary_typecode, n_segments, n_values = _MAPPED_RANGE_KEY_DICT_HEADER.unpack_from(
+            self._mmap, 0)
+        if magic != _MAPPED_RANGE_KEY_DICT_MAGIC:
+            self._mmap.close()
+            raise ValueError(f'{repr(path)} is not a file written by RangeKeyDict.save')
+        if byte_order != sys.byteorder[0].encode():
+            self._mmap.close()
+            raise ValueError(f'{repr(path)} is written on a machine of different byte order')
+
+        buf = memoryview(self._mmap)
+        offset = header_size
+        sections = []
+        for typecode, length in ((boundary_typecode.decode(), n_segments), (boundary_typecode.decode(), n_segments),
+                                 ('q', n_segments), ('q', n_values + 1)):
+            sections.append(buf[offset:offset + length * 8].cast(typecode))
+            offset += length * 8
+        self._buf = buf
+        self._begins, self._ends, self._value_indices, self._value_offsets = sections
+        self._values_offset = offset
+        self._values_cache: Dict[int, VT] = {}
+
+    def __len__(self) -> int:
+        return len(self._begins)
+
+    def _get_value(self, value_idx: int) -> VT:
+        try:
+            return self._values_cache[value_idx]
+        except KeyError:
+            begin = self._values_offset + self._value_offsets[value_idx]
+            end = self._values_offset + self._value_offsets[value_idx + 1]
+            val = self._values_cache[value_idx] = pickle.loads(self._buf[begin:end])
+            return val
+
+    def __getitem__(self, number):
+        begins = self._begins
+        try:
+            idx = bisect_right(begins, number) - 1
+        except TypeError:
+            raise KeyError(f'KeyError: {repr(number)} is not comparable with other keys')
+        if idx >= 0:
+            begin = begins[idx]
+            if begin == number or begin < number < self._ends[idx]:
+                return self._get_value(self._value_indices[idx])
+        raise KeyError(f'KeyError: {repr(number)}')
+
+    def get(self, number, default=None):
+        try:
+            return self.__getitem__(number)
+        except KeyError:
+            return default
+
+    def close(self) -> None:
+        for view in (self._begins, self._ends, self._value_indices, self._value_offsets, self._buf):
+            view.release()
+        self._mmap.close()
+
+    def __enter__(self) -> 'MappedRangeKeyDict[KT, VT]':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+class HotSwapRangeKeyDict(Generic[KT, VT]):
+    """
+    Container of RangeKeyDict which can be reloaded under live traffic,
+    the replacement is built by loader in a background thread, and published by a single reference assignment,
+    so readers never block, and never see a half-built table
+    """
+
+    Stats = namedtuple('Stats', ['swap_count', 'failure_count', 'last_duration', 'total_duration', 'last_error'])
+
+    def __init__(self, loader: Callable[[], Union[RangeKeyDict[KT, VT], Dict[Union[Tuple[KT, KT], KT], VT]]]):
+        """
+        :param loader: returns the RangeKeyDict (or input dict for RangeKeyDict) to serve,
+                       called once synchronously here, and in a background thread for each reload
+        """
+        self._loader = loader
+        self._lock = threading.Lock()  # only for reloading and stats, never taken by readers
+        self._reloading: Optional[threading.Thread] = None
+        self._swap_count = 0
+        self._failure_count = 0
+        self._last_duration = 0.0
+        self._total_duration = 0.0
+        self._last_error: Optional[BaseException] = None
+        self._current: RangeKeyDict[KT, VT] = self._load()
+
+    def _load(self) -> RangeKeyDict[KT, VT]:
+        table = self._loader()
+        return table if isinstance(table, RangeKeyDict) else RangeKeyDict(table)
+
+    @property
+    def current(self) -> RangeKeyDict[KT, VT]:
+        """the RangeKeyDict being served, keep it to do several lookups on the same version"""
+        return self._current
+
+    def __getitem__(self, number):
+        return self._current[number]
+
+    def get(self, number, default=None):
+        return self._current.get(number, default)
+
+    def _reload(self) -> None:
+        begin_time = time.perf_counter()
+        try:
+            table = self._load()
+        except Exception as e:
+            with self._lock:
+                self._failure_count += 1
+                self._last_error = e
+                self._reloading = None
+            return
+        duration = time.perf_counter() - begin_time
+        # a single reference assignment, readers get either the old or the new table
+        self._current = table
+        with self._lock:
+            self._swap_count += 1
+            self._last_duration = duration
+            self._total_duration += duration
+            self._last_error = None
+            self._reloading = None
+
+    def reload(self, wait: bool = False) -> threading.Thread:
+        """
+        Build the replacement in a background thread, if a reload is already running, no new one is started,
+        :param wait: if True, return after the reload is done (or failed, the old table is kept then, see stats)
+        :return: the thread doing the reload
+        """
+        with self._lock:
+            thread = self._reloading
+            if thread is None:
+                thread = self._reloading = threading.Thread(target=self._reload, daemon=True)
+                thread.start()
+        if wait:
+            thread.join()
+        return thread
+
+    @property
+    def stats(self) -> 'HotSwapRangeKeyDict.Stats':
+        """swaps done, failed reloads, last/total seconds of successful reloads, error of the last reload if failed"""
+        with self._lock:
+            return self.Stats(swap_count=self._swap_count, failure_count=self._failure_count,
+                              last_duration=self._last_duration, total_duration=self._total_duration,
+                              last_error=self._last_error)
+
+
+class MutableRangeKeyDict(RangeKeyDict[KT, VT]):
+    """
+    RangeKeyDict which can add/remove/update ranges one by one,
+    the sorted segments are maintained incrementally, overlapping is checked only against the neighbor segments,
+    so each change is O(log n) comparisons plus O(n) memory move for list insertion/deletion, no full rebuild
+    """
+
+    def _find(self, key: Union[Tuple[KT, KT], KT]) -> int:
+        """index of the segment exactly matching key in sorted segments"""
+        left_boundary_key, right_boundary_key = self._parse_key(key)
+        segment = self._left_boundary_segment_map.get(left_boundary_key)
+        if segment is None or segment.end != right_boundary_key:
+            raise KeyError(f'KeyError: {repr(key)}')
+        return bisect_left(self._begins, left_boundary_key)
+
+    def add_range(self, key: Union[Tuple[KT, KT], KT], val: VT) -> None:
+        """add range key (left-closed, right-open) or single point key, which must not overlap existing ones"""
+        left_boundary_key, right_boundary_key = self._parse_key(key)
+        boundary_keys = [left_boundary_key, right_boundary_key]
+        if self._begins:
+            boundary_keys.append(self._begins[0])
+        self._validate_boundary_key_type(boundary_keys)
+
+        segment = RangeKeyDict.Segment(begin=left_boundary_key, end=right_boundary_key, val=val)
+        if left_boundary_key in self._left_boundary_segment_map:
+            prev_segment = self._left_boundary_segment_map[left_boundary_key]
+            raise ValueError(
+                f'Duplicated left boundary key {repr(left_boundary_key)} detected: '
+                f'{str(prev_segment)}, {str(segment)}')
+
+        segments = self._sorted_segments
+        idx = bisect_left(self._begins, left_boundary_key)
+        for prev, cur in ((segments[idx - 1] if idx > 0 else None, segment),
+                          (segment, segments[idx] if idx < len(segments) else None)):
+            if prev is not None and cur is not None and (
+                    prev.end > cur.begin or prev.begin == prev.end == cur.begin):
+                raise ValueError(f'Overlap detected: {str(prev)}, {str(cur)}')
+
+        segments.insert(idx, segment)
+        self._begins.insert(idx, left_boundary_key)
+        self._ends.insert(idx, right_boundary_key)
+        self._left_boundary_segment_map[left_boundary_key] = segment
+        if not isinstance(key, tuple):
+            self._single_point_map[key] = val
+        self._invalidate_caches()
+
+    def remove_range(self, key: Union[Tuple[KT, KT], KT]) -> VT:
+        """remove range key or single point key exactly matching an existing one, return its value"""
+        idx = self._find(key)
+        segment = self._sorted_segments.pop(idx)
+        del self._begins[idx]
+        del self._ends[idx]
+        del self._left_boundary_segment_map[segment.begin]
+        if not isinstance(key, tuple):
+            del self._single_point_map[key]
+        self._invalidate_caches()
+        return segment.val
+
+    def update_range(self, key: Union[Tuple[KT, KT], KT], val: VT) -> None:
+        """
+        replace the value of range key or single point key exactly matching an existing one,
+        to change boundaries, use remove_range and add_range
+        """
+        idx = self._find(key)
+        segment = self._sorted_segments[idx]._replace(val=val)
+        self._sorted_segments[idx] = segment
+        self._left_boundary_segment_map[segment.begin] = segment
+        if not isinstance(key, tuple):
+            self._single_point_map[key] = val
+        self._invalidate_caches()
+
+
+class _IntervalTreeNode:
+    """
+    node of centered interval tree, keeps (rank, segment) pairs containing center,
+    sorted by begin ascending and by end descending, smaller/larger segments go to left/right
+    """
+    __slots__ = ('center', 'by_begin', 'by_end', 'left', 'right')
+
+    def __init__(self, ranked_segments: List[Tuple[int, 'RangeKeyDict.Segment']]):
+        # median of begins, the segment beginning at center always stays here, and both sides get at most half
+        begins = sorted(segment.begin for _, segment in ranked_segments)
+        center = self.center = begins[len(begins) // 2]
+        here, left, right = [], [], []
+        for ranked_segment in ranked_segments:
+            segment = ranked_segment[1]
+            if segment.end < center or (segment.end == center and segment.begin < segment.end):
+                left.append(ranked_segment)
+            elif segment.begin > center:
+                right.append(ranked_segment)
+            else:
+                here.append(ranked_segment)
+        self.by_begin = sorted(here, key=lambda x: x[1].begin)
+        self.by_end = sorted(here, key=lambda x: x[1].end, reverse=True)
+        self.left = _IntervalTreeNode(left) if left else None
+        self.right = _IntervalTreeNode(right) if right else None
+
+
+class OverlappingRangeKeyDict(Generic[KT, VT]):
+    """
+    Like RangeKeyDict, but ranges (left-closed, right-open) and single points may overlap,
+    backed by a centered interval tree, get_all(point) and overlapping(begin, end) are O(log n + k),
+    k is the number of matched ranges
+    """
+
+    def __init__(self, items: Union[Dict[Union[Tuple[KT, KT], KT], VT],
+                                    Iterable[Tuple[Union[Tuple[KT, KT], KT], VT]]]) -> None:
+        """
+        :param items: dict or iterable of (key, value) pairs, so that one range can have multiple values,
+                      keys must be tuple-like intervals (left-closed, right-open) or single point
+        """
+        pairs = items.items() if isinstance(items, Mapping) else items
+        segments: List[RangeKeyDict.Segment] = []
+        boundary_keys: List[KT] = []
+        for key, val in pairs:
+            left_boundary_key, right_boundary_key = RangeKeyDict._parse_key(key)
+            boundary_keys.extend([left_boundary_key, right_boundary_key])
+            segments.append(RangeKeyDict.Segment(begin=left_boundary_key, end=right_boundary_key, val=val))
+        RangeKeyDict._validate_boundary_key_type(boundary_keys)
+
+        # results are sorted by rank, i.e. by (begin, end), then by input order
+        self._sorted_segments = sorted(segments, key=lambda segment: (segment.begin, segment.end))
+        ranked_segments = list(enumerate(self._sorted_segments))
+        self._root = _IntervalTreeNode(ranked_segments) if ranked_segments else None
+
+    def __len__(self) -> int:
+        return len(self._sorted_segments)
+
+    def _stab(self, point: KT) -> List[Tuple[int, 'RangeKeyDict.Segment']]:
+        result = []
+        node = self._root
+        while node is not None:
+            if point < node.center:
+                for ranked_segment in node.by_begin:
+                    if not ranked_segment[1].begin <= point:
+                        break
+                    result.append(ranked_segment)
+                node = node.left
+            elif point > node.center:
+                for ranked_segment in node.by_end:
+                    if not ranked_segment[1].end > point:
+                        break
+                    result.append(ranked_segment)
+                node = node.right
+            else:
+                result.extend(node.by_begin)
+                break
+        return result
+
+    def _overlap(self, begin: KT, end: KT) -> List[Tuple[int, 'RangeKeyDict.Segment']]:
+        result = []
+        nodes = [self._root] if self._root is not None else []
+        while nodes:
+            node = nodes.pop()
+            if end <= node.center:
+                for ranked_segment in node.by_begin:
+                    if not ranked_segment[1].begin < end:
+                        break
+                    result.append(ranked_segment)
+                if node.left is not None:
+                    nodes.append(node.left)
+            elif begin > node.center:
+                for ranked_segment in node.by_end:
+                    if not ranked_segment[1].end > begin:
+                        break
+                    result.append(ranked_segment)
+                if node.right is not None:
+                    nodes.append(node.right)
+            else:
+                result.extend(node.by_begin)
+                nodes.extend(child for child in (node.left, node.right) if child is not None)
+        return result
+
+    def get_all(self, point: KT) -> List[VT]:
+        """values of all the ranges/single points containing point, sorted by (begin, end) of ranges"""
+        try:
+            ranked_segments = self._stab(point)
+        except TypeError:
+            raise KeyError(f'KeyError: {repr(point)} is not comparable with other keys')
+        return [segment.val for _, segment in sorted(ranked_segments, key=lambda x: x[0])]
+
+    def overlapping(self, begin: KT, end: KT) -> List['RangeKeyDict.Segment']:
+        """all the ranges/single points overlapping range [begin, end), sorted by (begin, end)"""
+        if not begin < end:
+            raise ValueError(f'Invalid range [{repr(begin)}, {repr(end)}), begin must < end')
+        ranked_segments = self._overlap(begin, end)
+        return [segment for _, segment in sorted(ranked_segments, key=lambda x: x[0])]
+
+
+class BoxKeyDict(Generic[KT, VT]):
+    """
+    Dict keyed by N-dimensional boxes, e.g. {((weight_begin, weight_end), (distance_begin, distance_end)): rate},
+    each dimension is a range (left-closed, right-open) validated as keys of RangeKeyDict, boxes must not overlap.
+    Dimension 0 is cut into slabs by all the boundaries, each slab keeps an (N-1)-dimensional index of the boxes
+    crossing it, the last dimension is a RangeKeyDict, so a point query is N bisects, O(N * log n),
+    identical indexes of adjacent slabs are merged.
+    Every box is copied into the index of each slab it crosses, so building takes time and memory in proportion to
+    the total number of (box, slab) pairs: close to linear for boxes tiling a grid (e.g. rate tables),
+    but quadratic in the worst case, e.g. 2000 boxes stacked like a staircase ((i, n), (i, i + 1))
+    take tens of seconds and hundreds of MB, one more level of the same for each extra dimension
+    """
+
+    def __init__(self, input_dict: Dict[Tuple[Tuple[KT, KT], ...], VT]) -> None:
+        items = list(input_dict.items())
+        ndim = len(items[0][0]) if items and isinstance(items[0][0], tuple) else 0
+        for box, _ in items:
+            if not (isinstance(box, tuple) and len(box) == ndim > 0 and all(
+                    isinstance(key, tuple) for key in box)):
+                raise ValueError(f'Invalid box key {repr(box)}, box keys must be tuples of (begin, end) ranges, '
+                                 f'of the same dimensions')
+            for key in box:
+                RangeKeyDict._parse_key(key)
+        for dim in range(ndim):
+            RangeKeyDict._validate_boundary_key_type([boundary for box, _ in items for boundary in box[dim]])
+
+        self._ndim = ndim
+        self._len = len(items)
+        self._root: Optional[RangeKeyDict] = self._build(items, 0) if items else None
+
+    def _build(self, items: List[Tuple[Tuple[Tuple[KT, KT], ...], VT]], dim: int) -> RangeKeyDict:
+        items = sorted(items, key=lambda item: item[0][dim])
+        if dim == self._ndim - 1:
+            for (prev_box, prev_val), (box, val) in zip(items, items[1:]):
+                if prev_box[dim][1] > box[dim][0]:
+                    raise ValueError(f'Overlap detected: {repr(prev_box)}: {repr(prev_val)}, {repr(box)}: {repr(val)}')
+            return RangeKeyDict.from_sorted((box[dim][0], box[dim][1], val) for box, val in items)
+
+        boundaries = sorted({boundary for box, _ in items for boundary in box[dim]})
+        slab_items: List[List[int]] = [[] for _ in range(len(boundaries) - 1)]
+        for idx, (box, _) in enumerate(items):
+            begin, end = box[dim]
+            for slab_idx in range(bisect_left(boundaries, begin), bisect_left(boundaries, end)):
+                slab_items[slab_idx].append(idx)
+
+        sub_indexes: Dict[Tuple[int, ...], RangeKeyDict] = {}
+        slabs: List[Tuple[KT, KT, RangeKeyDict]] = []
+        for slab_idx, box_indices in enumerate(slab_items):
+            if not box_indices:
+                continue
+            box_ids = tuple(box_indices)
+            sub_index = sub_indexes.get(box_ids)
+            if sub_index is None:
+                sub_index = sub_indexes[box_ids] = self._build([items[idx] for idx in box_ids], dim + 1)
+            slab_begin, slab_end = boundaries[slab_idx], boundaries[slab_idx + 1]
+            if slabs and slabs[-1][1] == slab_begin and slabs[-1][2] is sub_index:
+                slabs[-1] = (slabs[-1][0], slab_end, sub_index)
+            else:
+                slabs.append((slab_begin, slab_end, sub_index))
+        return RangeKeyDict.from_sorted(slabs)
+
+    @property
+    def ndim(self) -> int:
+        return self._ndim
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, point: Tuple[KT, ...]) -> VT:
+        if self._root is None or not isinstance(point, tuple) or len(point) != self._ndim:
+            raise KeyError(f'KeyError: {repr(point)}')
+        node: Any = self._root
+        try:
+            for coordinate in point:
+                node = node[coordinate]
+        except KeyError:
+            raise KeyError(f'KeyError: {repr(point)}')
+        return node
+
+    def get(self, point: Tuple[KT, ...], default=None):
+        try:
+            return self.__getitem__(point)
+        except KeyError:
+            return default
+
 
 class StrKeyIdDict(UserDict):
     """
@@ -671,9 +2177,516 @@ class StrKeyIdDict(UserDict):
         """not hashable"""
         return None
 
+    def __ior__(self, other):
+        # UserDict.__ior__ merges into self.data directly, skipping key normalization
+        self.update(other)
+        return self
+
     @classmethod
     def fromkeys(cls, iterable, value=None):
         d = cls()
         for key in iterable:
             d[key] = value
         return d
+
+    @classmethod
+    def _normalize_items(cls, rows: Iterable, unique: bool,
+                         get_key: Optional[Callable[[Any], Any]] = None) -> Dict[str, Any]:
+        """
+        single pass over rows, returns a new dict keyed by str IDs,
+        rows are (key, value) pairs if get_key is None, else (get_key(row), row) is used
+        """
+        data: Dict[str, Any] = {}
+        is_valid_key = cls.is_valid_key
+        for row in rows:
+            if get_key is None:
+                key, value = row
+            else:
+                key, value = get_key(row), row
+            if type(key) is str:
+                str_key = key
+            elif type(key) is int or is_valid_key(key):
+                str_key = str(key)
+            else:
+                raise TypeError(f'{repr(key)}: Key for ID must be an integer or a string, but got {type(key)}')
+            if unique and str_key in data:
+                raise TypeError(f'Duplicated keys: {repr(key)} detected')
+            data[str_key] = value
+        return data
+
+    @classmethod
+    def _from_valid_data(cls, data: Dict[str, Any]):
+        """wrap an already normalized dict without copying it again"""
+        inst = cls.__new__(cls)
+        inst.data = data
+        return inst
+
+    @classmethod
+    def from_rows(cls, rows: Iterable, key: Union[Callable[[Any], Union[int, str]], Hashable, None] = None):
+        """
+        Build from rows in a single pass, e.g. a DB result set.
+        If key is None, rows are (id, value) pairs,
+        otherwise each row is the value and its ID is key(row), or row[key] if key is not callable.
+        Duplicated IDs (e.g. '1' and 1) raise TypeError, just like the constructor.
+        """
+        if key is None or callable(key):
+            get_key = key
+        else:
+            get_key = operator.itemgetter(key)
+        return cls._from_valid_data(cls._normalize_items(rows, unique=True, get_key=get_key))
+
+    def get_many(self, keys: Iterable, default=None) -> List:
+        """values for keys in the same order, default for missing keys"""
+        data = self.data
+        return [data.get(key if type(key) is str else str(key), default) for key in keys]
+
+    def set_many(self, items: Union[Mapping, Iterable[Tuple[Any, Any]]]) -> None:
+        """like update, but normalizes all keys in one pass, later values win for duplicated IDs"""
+        if isinstance(items, Mapping):
+            items = items.items()
+        self.data.update(self._normalize_items(items, unique=False))
+
+
+class IntIndexedStrKeyIdDict(StrKeyIdDict):
+    """
+    A StrKeyIdDict keeping an extra index from int IDs to values, for int-ID-heavy hot paths.
+    Keys are still stored (and iterated) as strings, but int lookups/containment checks hit the int index
+    directly, without allocating str(key) or going through the __missing__ path.
+    Only keys in canonical int form are indexed ('12' and 12 share one entry, '012' is a plain str key).
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._int_data: Dict[int, Any] = {}
+        super().__init__(*args, **kwargs)
+
+    @staticmethod
+    def _int_id(key: str) -> Optional[int]:
+        """int form of key if key is a canonical int string, else None"""
+        try:
+            int_key = int(key)
+        except ValueError:
+            return None
+        return int_key if str(int_key) == key else None
+
+    def __getitem__(self, key):
+        if type(key) is int:
+            try:
+                return self._int_data[key]
+            except KeyError:
+                pass
+        elif type(key) is str:
+            try:
+                return self.data[key]
+            except KeyError:
+                pass
+        return super().__getitem__(key)
+
+    def __contains__(self, key):
+        if type(key) is int:
+            return key in self._int_data
+        if type(key) is str:
+            return key in self.data
+        return super().__contains__(key)
+
+    def __setitem__(self, key, value):
+        if type(key) is int:
+            self.data[str(key)] = value
+            self._int_data[key] = value
+            return
+        super().__setitem__(key, value)
+        int_key = self._int_id(str(key))
+        if int_key is not None:
+            self._int_data[int_key] = value
+
+    def __delitem__(self, key):
+        str_key = str(key)
+        del self.data[str_key]
+        int_key = key if type(key) is int else self._int_id(str_key)
+        if int_key is not None:
+            del self._int_data[int_key]
+
+    def __copy__(self):
+        inst = super().__copy__()
+        inst._int_data = self._int_data.copy()
+        return inst
+
+    @classmethod
+    def _int_index(cls, data: Dict[str, Any]) -> Dict[int, Any]:
+        int_data: Dict[int, Any] = {}
+        for str_key, value in data.items():
+            int_key = cls._int_id(str_key)
+            if int_key is not None:
+                int_data[int_key] = value
+        return int_data
+
+    @classmethod
+    def _from_valid_data(cls, data: Dict[str, Any]):
+        inst = super()._from_valid_data(data)
+        inst._int_data = cls._int_index(data)
+        return inst
+
+    def get_many(self, keys: Iterable, default=None) -> List:
+        data, int_data = self.data, self._int_data
+        return [int_data.get(key, default) if type(key) is int else
+                data.get(key if type(key) is str else str(key), default) for key in keys]
+
+    def set_many(self, items: Union[Mapping, Iterable[Tuple[Any, Any]]]) -> None:
+        if isinstance(items, Mapping):
+            items = items.items()
+        data = self._normalize_items(items, unique=False)
+        self.data.update(data)
+        self._int_data.update(self._int_index(data))
+
+
+class LRUStrKeyIdDict(StrKeyIdDict):
+    """
+    A bounded StrKeyIdDict for caching entities by ID, every operation is O(1) (amortized for expiry).
+    When maxsize is exceeded, the least recently used entry is evicted, reading an entry (d[key], get, get_many)
+    marks it as recently used, while membership tests and the keys/values/items snapshots do not.
+    With ttl, each entry expires ttl seconds (measured by timer) after it was last written.
+    Not thread-safe, just like StrKeyIdDict.
+    """
+
+    Stats = namedtuple('Stats', ['hits', 'misses', 'evictions', 'expirations', 'size', 'maxsize'])
+
+    def __init__(self, *args, maxsize: int = 128, ttl: Optional[float] = None,
+                 timer: Callable[[], float] = time.monotonic, **kwargs):
+        """
+        :param maxsize: max number of entries kept, must be positive
+        :param ttl: seconds an entry lives after it was written, None means never expires
+        :param timer: returns the current time in seconds, must be monotonic
+        """
+        if maxsize <= 0:
+            raise ValueError(f'maxsize must be positive, but got {repr(maxsize)}')
+        if ttl is not None and ttl <= 0:
+            raise ValueError(f'ttl must be positive, but got {repr(ttl)}')
+        validated_data = self._validate_input(*args, **kwargs)
+        self.maxsize, self.ttl, self.timer = maxsize, ttl, timer
+        self.data: OrderedDict = OrderedDict()  # least recently used first
+        # str key -> deadline, ordered by deadline since all entries share one ttl
+        self._deadlines: OrderedDict = OrderedDict()
+        self._hits = self._misses = self._evictions = self._expirations = 0
+        for key, value in validated_data.items():
+            self._store(key, value)
+
+    def _expire(self) -> None:
+        """drop expired entries from the oldest one, amortized O(1)"""
+        deadlines = self._deadlines
+        if not deadlines:
+            return
+        now = self.timer()
+        while deadlines:
+            str_key, deadline = next(iter(deadlines.items()))
+            if deadline > now:
+                break
+            del deadlines[str_key]
+            del self.data[str_key]
+            self._expirations += 1
+
+    def _store(self, str_key: str, value) -> None:
+        data = self.data
+        data[str_key] = value
+        data.move_to_end(str_key)
+        if self.ttl is not None:
+            self._deadlines[str_key] = self.timer() + self.ttl
+            self._deadlines.move_to_end(str_key)
+        while len(data) > self.maxsize:
+            evicted_key, _ = data.popitem(last=False)
+            self._deadlines.pop(evicted_key, None)
+            self._evictions += 1
+
+    @staticmethod
+    def _str_key(key):
+        return key if type(key) is str else str(key)
+
+    def __getitem__(self, key):
+        self._expire()
+        str_key = self._str_key(key)
+        try:
+            value = self.data[str_key]
+        except KeyError:
+            self._misses += 1
+            raise KeyError(f'KeyError: {repr(str_key)}') from None
+        self.data.move_to_end(str_key)
+        self._hits += 1
+        return value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        self._expire()
+        return self._str_key(key) in self.data
+
+    def __setitem__(self, key, value):
+        if not self.is_valid_key(key):
+            raise TypeError(f'Key must be a string or integer, but got {repr(key)}')
+        self._expire()
+        self._store(self._str_key(key), value)
+
+    def __delitem__(self, key):
+        self._expire()
+        str_key = self._str_key(key)
+        del self.data[str_key]
+        self._deadlines.pop(str_key, None)
+
+    def __len__(self):
+        self._expire()
+        return len(self.data)
+
+    def __iter__(self):
+        self._expire()
+        # iterate over a snapshot, reading entries in the loop reorders self.data
+        return iter(list(self.data))
+
+    # snapshots like __iter__, so entries can be read (and reordered) while iterating
+    def keys(self):
+        self._expire()
+        return dict(self.data).keys()
+
+    def values(self):
+        self._expire()
+        return dict(self.data).values()
+
+    def items(self):
+        self._expire()
+        return dict(self.data).items()
+
+    def popitem(self):
+        """remove and return the least recently used (key, value), O(1), not counted as a hit"""
+        self._expire()
+        str_key, value = self.data.popitem(last=False)
+        self._deadlines.pop(str_key, None)
+        return str_key, value
+
+    def __eq__(self, other: object) -> bool:
+        self._expire()
+        if isinstance(other, StrKeyIdDict):
+            # compare regardless of the recency order
+            return dict(self.data) == dict(other.items())
+        return super().__eq__(other)
+
+    __hash__ = StrKeyIdDict.__hash__
+
+    def __copy__(self):
+        inst = self.__class__.__new__(self.__class__)
+        inst.__dict__.update(self.__dict__)
+        inst.data = self.data.copy()
+        inst._deadlines = self._deadlines.copy()
+        return inst
+
+    def copy(self):
+        return self.__copy__()
+
+    # UserDict.__or__/__ror__ build the result with the default maxsize/ttl
+    def __or__(self, other):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        inst = self.__copy__()
+        inst.set_many(other)
+        return inst
+
+    def __ror__(self, other):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        inst = type(self)(maxsize=self.maxsize, ttl=self.ttl, timer=self.timer)
+        inst.set_many(other)
+        inst.set_many(self.data)
+        return inst
+
+    def clear(self):
+        self.data.clear()
+        self._deadlines.clear()
+
+    @classmethod
+    def from_rows(cls, rows: Iterable, key: Union[Callable[[Any], Union[int, str]], Hashable, None] = None, *,
+                  maxsize: int = 128, ttl: Optional[float] = None, timer: Callable[[], float] = time.monotonic):
+        """StrKeyIdDict.from_rows with the cache options, rows beyond maxsize evict the earlier ones"""
+        inst = cls(maxsize=maxsize, ttl=ttl, timer=timer)
+        for str_key, value in StrKeyIdDict.from_rows(rows, key=key).data.items():
+            inst._store(str_key, value)
+        return inst
+
+    def get_many(self, keys: Iterable, default=None) -> List:
+        return [self.get(key, default) for key in keys]
+
+    def set_many(self, items: Union[Mapping, Iterable[Tuple[Any, Any]]]) -> None:
+        if isinstance(items, Mapping):
+            items = items.items()
+        self._expire()
+        for str_key, value in self._normalize_items(items, unique=False).items():
+            self._store(str_key, value)
+
+    @property
+    def stats(self) -> 'LRUStrKeyIdDict.Stats':
+        """reads that found/missed the key, entries evicted for maxsize/dropped for ttl, current/max size"""
+        return self.Stats(hits=self._hits, misses=self._misses, evictions=self._evictions,
+                          expirations=self._expirations, size=len(self), maxsize=self.maxsize)
+
+
+class ShardedStrKeyIdDict(StrKeyIdDict):
+    """
+    A thread-safe StrKeyIdDict split into shards by the hash of the str key, each shard has its own lock.
+    Reads are lock-free (a single dict lookup is atomic), writes lock only the shard of the key,
+    so threads working on different keys rarely wait for each other.
+    data, len, iteration and the keys/values/items views are snapshots, consistent within each shard only.
+    """
+
+    def __init__(self, *args, shards: int = 16, **kwargs):
+        """
+        :param shards: number of shards, more shards means less contention between writers
+        """
+        validated_data = self._validate_input(*args, **kwargs)
+        self._init_shards(shards)
+        self._put_all(validated_data)
+
+    def _init_shards(self, shards: int) -> None:
+        if shards <= 0:
+            raise ValueError(f'shards must be positive, but got {repr(shards)}')
+        self._shards: List[Dict[str, Any]] = [{} for _ in range(shards)]
+        self._locks: List[threading.Lock] = [threading.Lock() for _ in range(shards)]
+
+    def _put_all(self, data: Dict[str, Any]) -> None:
+        """write normalized data, locking each shard once"""
+        grouped: Dict[int, Dict[str, Any]] = {}
+        n_shards = len(self._shards)
+        for str_key, value in data.items():
+            grouped.setdefault(hash(str_key) % n_shards, {})[str_key] = value
+        for index, shard_data in grouped.items():
+            with self._locks[index]:
+                self._shards[index].update(shard_data)
+
+    def _locate(self, key) -> Tuple[str, Dict[str, Any], threading.Lock]:
+        str_key = key if type(key) is str else str(key)
+        index = hash(str_key) % len(self._shards)
+        return str_key, self._shards[index], self._locks[index]
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        """merged snapshot of all shards"""
+        merged: Dict[str, Any] = {}
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                merged.update(shard)
+        return merged
+
+    @property
+    def shard_count(self) -> int:
+        return len(self._shards)
+
+    def __getitem__(self, key):
+        str_key = key if type(key) is str else str(key)
+        try:
+            return self._shards[hash(str_key) % len(self._shards)][str_key]
+        except KeyError:
+            raise KeyError(f'KeyError: {repr(str_key)}') from None
+
+    def get(self, key, default=None):
+        str_key = key if type(key) is str else str(key)
+        return self._shards[hash(str_key) % len(self._shards)].get(str_key, default)
+
+    def __contains__(self, key):
+        str_key = key if type(key) is str else str(key)
+        return str_key in self._shards[hash(str_key) % len(self._shards)]
+
+    def __setitem__(self, key, value):
+        if not self.is_valid_key(key):
+            raise TypeError(f'Key must be a string or integer, but got {repr(key)}')
+        str_key, shard, lock = self._locate(key)
+        with lock:
+            shard[str_key] = value
+
+    def __delitem__(self, key):
+        str_key, shard, lock = self._locate(key)
+        with lock:
+            del shard[str_key]
+
+    def pop(self, key, *default):
+        str_key, shard, lock = self._locate(key)
+        with lock:
+            return shard.pop(str_key, *default)
+
+    def setdefault(self, key, default=None):
+        if not self.is_valid_key(key):
+            raise TypeError(f'Key must be a string or integer, but got {repr(key)}')
+        str_key, shard, lock = self._locate(key)
+        with lock:
+            return shard.setdefault(str_key, default)
+
+    def popitem(self):
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                if shard:
+                    return shard.popitem()
+        raise KeyError('popitem(): dictionary is empty')
+
+    def clear(self):
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                shard.clear()
+
+    def __len__(self):
+        return sum(map(len, self._shards))
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def keys(self):
+        return self.data.keys()
+
+    def values(self):
+        return self.data.values()
+
+    def items(self):
+        return self.data.items()
+
+    def __copy__(self):
+        return self._from_valid_data(self.data, shards=len(self._shards))
+
+    def copy(self):
+        return self.__copy__()
+
+    # UserDict.__or__/__ror__ build the result with the default number of shards
+    def __or__(self, other):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        inst = self.__copy__()
+        inst.set_many(other)
+        return inst
+
+    def __ror__(self, other):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        inst = self._from_valid_data({}, shards=self.shard_count)
+        inst.set_many(other)
+        inst.set_many(self.data)
+        return inst
+
+    def __reduce__(self):
+        # locks are not picklable, rebuild from a snapshot
+        return self._from_valid_data, (self.data, len(self._shards))
+
+    @classmethod
+    def _from_valid_data(cls, data: Dict[str, Any], shards: int = 16):
+        inst = cls.__new__(cls)
+        inst._init_shards(shards)
+        inst._put_all(data)
+        return inst
+
+    @classmethod
+    def from_rows(cls, rows: Iterable, key: Union[Callable[[Any], Union[int, str]], Hashable, None] = None, *,
+                  shards: int = 16):
+        """StrKeyIdDict.from_rows with the shards option"""
+        return cls._from_valid_data(StrKeyIdDict.from_rows(rows, key=key).data, shards=shards)
+
+    def get_many(self, keys: Iterable, default=None) -> List:
+        get = self.get
+        return [get(key, default) for key in keys]
+
+    def set_many(self, items: Union[Mapping, Iterable[Tuple[Any, Any]]]) -> None:
+        if isinstance(items, Mapping):
+            items = items.items()
+        self._put_all(self._normalize_items(items, unique=False))
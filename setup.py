@@ -93,6 +93,9 @@ setup(
         "funcy>=1.16",
     ],
     extras_require={
+        "numpy": [
+            "numpy",
+        ],
         "test": [
             "pytest",
             "wheel",
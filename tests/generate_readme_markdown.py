@@ -67,22 +67,110 @@ FUNCTION_INTRODUCTIONS: Dict[str, Dict[str, str]] = {
         ),
     },
     'dict_utils': {
+        'BoxKeyDict': (
+            '`BoxKeyDict` keys values on N-dimensional boxes such as weight x distance, resolving a point '
+            'with one bisect per dimension.'
+        ),
+        'CompactFinalDictObj': (
+            '`CompactFinalDictObj` is a read-only `FinalDictObj` alternative for millions of same-shaped '
+            'records, sharing one key table among records and keeping only a tuple of values for each.'
+        ),
         'DictObj': (
             '`DictObj` exposes dictionary keys as attributes, enabling dot-style '
             'access in dynamic data structures.'
         ),
+        'DictObj_from_json': (
+            '`DictObj.from_json`/`from_json_lines` build wrapper objects directly while parsing JSON or '
+            'JSON Lines, skipping the extra copy of the parsed data and yielding records one at a time.'
+        ),
+        'DictObj_lazy': (
+            'Pass `lazy=True` to `DictObj`/`FinalDictObj` to convert nested dicts and lists only '
+            'when they are first accessed, keeping construction cheap for large payloads.'
+        ),
+        'DictObj_lock_free_reads': (
+            'Pass `lock_free_reads=True` to let read-heavy `DictObj` instances skip the lock on reads, '
+            'writers publish a modified copy so readers always see a consistent snapshot.'
+        ),
+        'DictObj_lock_policy': (
+            'Pass `lock_policy=\'shared\'` to let a whole `DictObj` tree share one lock, or '
+            '`lock_policy=\'none\'` to drop locking for single-threaded use, saving memory for large trees.'
+        ),
+        'DictObj_pickle': (
+            '`DictObj` pickles as plain data without its locks, and `FinalDictObj.to_shared_memory` publishes '
+            'a frozen tree once for worker processes to load by name.'
+        ),
+        'DictObj_view': (
+            '`DictObj.view` wraps an existing dict without copying it, writing changes through '
+            'or copying on the first write when `copy_on_write=True`.'
+        ),
         'FinalDictObj': (
             '`FinalDictObj` freezes dictionaries after construction, safeguarding '
             'nested data against accidental mutation.'
         ),
+        'FinalDictObj_hash': (
+            '`FinalDictObj` is hashable with a cached structural hash, and `intern=True` lets identical '
+            'subtrees share one instance, so frozen configs work as cache keys and dedupe in sets.'
+        ),
+        'HotSwapRangeKeyDict': (
+            '`HotSwapRangeKeyDict` reloads a `RangeKeyDict` in a background thread and swaps it in atomically, '
+            'so readers never block, with counters for reload cost.'
+        ),
+        'IntIndexedStrKeyIdDict': (
+            '`IntIndexedStrKeyIdDict` is a `StrKeyIdDict` with an extra int index, so int ID lookups '
+            'skip both the `str(key)` allocation and the `__missing__` fallback.'
+        ),
+        'LRUStrKeyIdDict': (
+            '`LRUStrKeyIdDict` is a bounded `StrKeyIdDict` cache with O(1) LRU eviction, optional ttl '
+            'for each entry and hit/miss/eviction counters.'
+        ),
+        'MappedRangeKeyDict': (
+            '`RangeKeyDict.save` compiles numeric ranges to a binary file, which `MappedRangeKeyDict` maps '
+            'in O(1) time and queries directly, sharing memory across worker processes.'
+        ),
+        'MutableRangeKeyDict': (
+            '`MutableRangeKeyDict` adds, removes and updates ranges one at a time, keeping the sorted '
+            'ranges incrementally and checking overlaps only against neighbouring ranges.'
+        ),
+        'OverlappingRangeKeyDict': (
+            '`OverlappingRangeKeyDict` accepts overlapping ranges and answers `get_all(point)` and '
+            '`overlapping(begin, end)` in O(log n + k) with a centered interval tree.'
+        ),
         'RangeKeyDict': (
             '`RangeKeyDict` associates lookup results with numeric ranges, yielding '
             'logarithmic-time queries backed by bisect searches.'
         ),
+        'RangeKeyDict_from_sorted': (
+            '`RangeKeyDict.from_sorted` builds from pre-sorted `(begin, end, value)` rows in one linear '
+            'validation pass, without sorting or an intermediate dict.'
+        ),
+        'RangeKeyDict_range_queries': (
+            '`RangeKeyDict.items(begin, end)`, `segments_between` and `gaps` lazily answer coverage queries '
+            'over `[begin, end)` in O(log n + k).'
+        ),
+        'RangeKeyDict_compile_dense': (
+            '`RangeKeyDict.compile_dense` turns small integer domains into a direct-index lookup table, '
+            'falling back to bisect for other keys.'
+        ),
+        'RangeKeyDict_get_many': (
+            '`RangeKeyDict.get_many`/`iter_many` resolve a batch of keys with a single merge-walk along '
+            'the ranges, sorting unsorted keys first and restoring their original order.'
+        ),
+        'RangeKeyDict_lookup_array': (
+            '`RangeKeyDict.lookup_array` resolves a whole numeric NumPy array at once with `searchsorted`, '
+            'returning values or range indices together with a mask for misses.'
+        ),
+        'ShardedStrKeyIdDict': (
+            '`ShardedStrKeyIdDict` is a thread-safe `StrKeyIdDict` split into locked shards by key hash, '
+            'with lock-free reads, for caches shared between many threads.'
+        ),
         'StrKeyIdDict': (
             '`StrKeyIdDict` assigns deterministic integer identifiers to string '
             'keys while maintaining bidirectional lookups.'
         ),
+        'StrKeyIdDict_batch': (
+            '`StrKeyIdDict.from_rows` builds the dict from rows in a single pass, while `get_many`/`set_many` '
+            'read and write a batch of IDs at once.'
+        ),
         'collect_leaves': (
             '`collect_leaves` traverses nested dictionaries and gathers terminal '
             'values into a flat structure.'
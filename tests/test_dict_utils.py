@@ -427,6 +427,301 @@ def test_DictObj():
     assert team.leader is not deep_copy_of_team.leader
     assert team.leader == deep_copy_of_team.leader
 
+    # input dict is copied once when constructing, nested containers/leaves are not shared with DictObj
+    tags = {'python'}
+    data = {'team': {'members': [{'name': 'albert', 'tags': tags}]}, 'dict': 'not a keyword argument'}
+    obj = DictObj(data)
+    obj.team.members[0].tags.add('java')
+    assert tags == {'python'}
+    assert obj['dict'] == 'not a keyword argument'
+
+
+def test_DictObj_lazy():
+    from pythonic_toolbox.utils.dict_utils import DictObj, FinalDictObj
+
+    api_response = {
+        'user': {'name': 'Albert', 'address': {'city': 'Beijing'}},
+        'orders': [{'id': 1, 'items': ['apple']}, {'id': 2, 'items': ['pear']}],
+        'total': 2,
+    }
+
+    # in lazy mode, only top-level keys are copied when constructing,
+    # nested dicts/lists are converted to DictObj/list when they are first accessed
+    obj = DictObj(api_response, lazy=True)
+    assert obj.total == 2
+    assert isinstance(obj.user, DictObj)
+    assert obj.user is obj.user  # converted only once
+    assert obj.user.address.city == 'Beijing'
+    assert isinstance(obj['orders'], list)
+    assert isinstance(obj.orders[0], DictObj)
+    assert obj.orders[1]['items'] == ['pear']
+
+    # behaves the same as an eagerly converted DictObj
+    assert obj == DictObj(api_response)
+    assert DictObj(api_response, lazy=True) == DictObj(api_response)
+    assert DictObj(api_response, lazy=True).to_dict() == api_response
+    assert repr(DictObj(api_response, lazy=True)) == repr(DictObj(api_response))
+
+    # modifying lazy DictObj won't touch the original dict
+    obj.user.address.city = 'Shanghai'
+    obj.orders[0]['items'].append('banana')
+    obj.orders.pop()
+    assert api_response['user']['address']['city'] == 'Beijing'
+    assert api_response['orders'][0]['items'] == ['apple']
+    assert len(api_response['orders']) == 2
+
+    obj = DictObj(api_response, lazy=True)
+    key, val = obj.popitem()
+    assert key == 'total' and val == 2
+    assert isinstance(obj.pop('orders')[0], DictObj)
+    assert set(obj.keys()) == {'user'}
+
+    # lazy mode also works for FinalDictObj
+    final_obj = FinalDictObj(api_response, lazy=True)
+    assert isinstance(final_obj.user, FinalDictObj)
+    assert isinstance(final_obj.orders, tuple)
+    assert final_obj.orders[0]['items'] == ('apple',)
+    assert final_obj == FinalDictObj(api_response)
+    assert final_obj.to_dict() == api_response
+
+
+def test_DictObj_view():
+    import pytest
+    from pythonic_toolbox.utils.dict_utils import DictObj, FinalDictObj
+
+    request_data = {'user': {'name': 'Albert', 'roles': ['admin']}, 'path': '/index', 'tags': [{'name': 'a'}]}
+
+    # view wraps the dict without copying it, reads go straight to the underlying dict
+    obj = DictObj.view(request_data)
+    assert obj.path == '/index'
+    assert obj.user.name == 'Albert'
+    assert obj.tags[0].name == 'a'
+    assert obj == DictObj(request_data)
+    assert obj.to_dict() == request_data
+
+    # by default, modifications are written through to the underlying dict
+    obj.path = '/home'
+    obj.user.roles.append('user')
+    obj.tags[0].name = 'b'
+    assert request_data['path'] == '/home'
+    assert request_data['user']['roles'] == ['admin', 'user']
+    assert request_data['tags'][0]['name'] == 'b'
+    del obj.path
+    assert 'path' not in request_data
+
+    # changes of the underlying dict are visible through the view
+    request_data['path'] = '/about'
+    assert obj.path == '/about'
+
+    # copy-on-write view takes a copy before the first modification, the underlying dict is never touched
+    request_data = {'user': {'name': 'Albert', 'roles': ['admin']}, 'path': '/index'}
+    obj = DictObj.view(request_data, copy_on_write=True)
+    assert obj.user.name == 'Albert'
+    obj.user.name = 'Steve'
+    obj.path = '/home'
+    obj.user.roles.append('user')
+    assert obj.user.name == 'Steve'
+    assert obj.to_dict() == {'user': {'name': 'Steve', 'roles': ['admin', 'user']}, 'path': '/home'}
+    assert request_data == {'user': {'name': 'Albert', 'roles': ['admin']}, 'path': '/index'}
+
+    # FinalDictObj view is read-only, nested lists are exposed as tuples
+    final_obj = FinalDictObj.view(request_data)
+    assert final_obj.user.roles == ('admin',)
+    assert final_obj == FinalDictObj(request_data)
+    with pytest.raises(RuntimeError):
+        final_obj.path = '/home'
+    with pytest.raises(RuntimeError):
+        final_obj.user.name = 'Steve'
+
+
+def test_DictObj_lock_free_reads():
+    import sys
+    from threading import Thread
+    from pythonic_toolbox.decorators.decorator_utils import method_synchronized
+    from pythonic_toolbox.utils.dict_utils import DictObj, FinalDictObj
+
+    # in lock-free-read mode, reading attributes/items takes no lock,
+    # writers still hold the lock, and replace the whole hidden dict, so readers never see a half-done write
+    config = DictObj({'db': {'host': 'localhost', 'port': 3306}, 'cnt': 0}, lock_free_reads=True)
+    assert config.db.host == 'localhost'
+    assert config.to_dict() == {'db': {'host': 'localhost', 'port': 3306}, 'cnt': 0}
+
+    keys = config.keys()  # snapshot of the keys at the time keys() is called
+    config.debug = True
+    assert 'debug' in config and 'debug' not in keys
+    del config.debug
+    assert 'debug' not in config
+
+    class MyObjDict(DictObj):
+        @method_synchronized
+        def increase_cnt_by_n(self, n):
+            self.cnt += n
+
+    def increase_cnt_by_100(dict_obj):
+        for i in range(100):
+            dict_obj.increase_cnt_by_n(1)
+
+    observed = []
+
+    def read_cnt(dict_obj):
+        for i in range(1000):
+            observed.append(dict_obj.cnt)
+
+    sw_interval = sys.getswitchinterval()
+    try:
+        sys.setswitchinterval(0.0001)
+        my_dict_obj = MyObjDict({'cnt': 0}, lock_free_reads=True)
+        threads = [Thread(target=increase_cnt_by_100, args=(my_dict_obj,)) for _ in range(100)]
+        threads.extend(Thread(target=read_cnt, args=(my_dict_obj,)) for _ in range(10))
+        [t.start() for t in threads]
+        [t.join() for t in threads]
+        assert my_dict_obj.cnt == 10000
+        assert all(0 <= cnt <= 10000 for cnt in observed)
+    finally:
+        sys.setswitchinterval(sw_interval)
+
+    # nested DictObj inherit lock-free-read mode, FinalDictObj is in lock-free-read mode by default
+    assert config.db._DictObj__lock_free_reads is True
+    assert FinalDictObj({'a': {'b': 1}}).a._DictObj__lock_free_reads is True
+    assert DictObj({'a': {'b': 1}}).a._DictObj__lock_free_reads is False
+
+
+def test_DictObj_lock_policy():
+    import sys
+    from threading import Thread
+
+    import pytest
+    from pythonic_toolbox.decorators.decorator_utils import method_synchronized
+    from pythonic_toolbox.utils.dict_utils import DictObj, FinalDictObj
+
+    data = {'a': {'b': {'c': 1}}, 'items': [{'id': 1}, {'id': 2}]}
+
+    # by default, every DictObj creates its own lock when it is first used
+    obj = DictObj(data)
+    obj.a.b.c = 2
+    assert obj.a.b._DictObj__synchronized_lock is not obj._DictObj__synchronized_lock
+
+    # 'shared': the whole tree shares one lock, including nodes created later
+    obj = DictObj(data, lock_policy='shared')
+    obj.a.d = {'e': 1}
+    lock = obj._DictObj__synchronized_lock
+    assert all(node._DictObj__synchronized_lock is lock for node in (obj.a, obj.a.b, obj.a.d, *obj['items']))
+    lazy_obj = DictObj(data, lazy=True, lock_policy='shared')
+    assert lazy_obj.a.b._DictObj__synchronized_lock is lazy_obj._DictObj__synchronized_lock is not lock
+    final_obj = FinalDictObj(data, lock_policy='shared')
+    assert final_obj.a.b._FinalDictObj__synchronized_lock is final_obj._FinalDictObj__synchronized_lock
+    # copies are independent trees with a lock of their own
+    import copy
+    copied, deep_copied = copy.copy(obj), copy.deepcopy(obj)
+    copied.f = {'g': 1}
+    assert copied._DictObj__synchronized_lock is copied.f._DictObj__synchronized_lock is not lock
+    deep_lock = deep_copied._DictObj__synchronized_lock
+    assert deep_lock is not lock
+    assert all(node._DictObj__synchronized_lock is deep_lock for node in (deep_copied.a.b, *deep_copied['items']))
+
+    # 'none': no lock at all, for single-threaded or read-only use
+    obj = DictObj(data, lock_policy='none')
+    obj.a.b.c = 2
+    assert obj.a.b.c == 2 and obj.to_dict()['a'] == {'b': {'c': 2}}
+    assert obj.a.b._DictObj__synchronized_lock is obj._DictObj__synchronized_lock
+
+    with pytest.raises(ValueError):
+        DictObj(data, lock_policy='global')
+
+    # writers of the same tree are serialized by the shared lock
+    class MyObjDict(DictObj):
+        @method_synchronized
+        def increase_cnt_by_n(self, n):
+            self.cnt += n
+
+        def increase_counters_by_n(self, n):
+            self.counter.increase_cnt_by_n(n)
+            self.increase_cnt_by_n(n)
+
+    def increase_by_100(dict_obj):
+        for i in range(100):
+            dict_obj.increase_counters_by_n(1)
+
+    sw_interval = sys.getswitchinterval()
+    try:
+        sys.setswitchinterval(0.0001)
+        my_dict_obj = MyObjDict({'cnt': 0, 'counter': {'cnt': 0}}, lock_policy='shared')
+        threads = [Thread(target=increase_by_100, args=(my_dict_obj,)) for _ in range(100)]
+        [t.start() for t in threads]
+        [t.join() for t in threads]
+        assert my_dict_obj.cnt == my_dict_obj.counter.cnt == 10000
+    finally:
+        sys.setswitchinterval(sw_interval)
+
+
+def test_DictObj_from_json():
+    import io
+
+    import pytest
+    from pythonic_toolbox.utils.dict_utils import DictObj, FinalDictObj
+
+    # DictObj is built directly while parsing, without copying the parsed dict again
+    payload = '{"user": {"name": "Albert", "roles": ["admin"]}, "orders": [{"id": 1}, {"id": 2}]}'
+    obj = DictObj.from_json(payload)
+    assert obj.user.name == 'Albert'
+    assert obj.orders[1].id == 2
+    assert obj == DictObj.from_json(io.StringIO(payload)) == DictObj.from_json(payload.encode())
+    obj.user.name = 'Steve'
+    assert obj.user.name == 'Steve'
+
+    final_obj = FinalDictObj.from_json(payload)
+    assert isinstance(final_obj.user, FinalDictObj)
+    assert final_obj.user.roles == ('admin',)
+    assert final_obj == FinalDictObj(DictObj.from_json(payload).to_dict())
+    with pytest.raises(RuntimeError):
+        final_obj.user.name = 'Steve'
+
+    with pytest.raises(ValueError):
+        DictObj.from_json('[1, 2]')
+
+    # JSON Lines records are built one at a time, from a file-like object or str/bytes buffer
+    lines = '{"id": 1, "tags": ["a"]}\n\n{"id": 2, "tags": []}\n'
+    records = FinalDictObj.from_json_lines(io.StringIO(lines))
+    assert next(records) == FinalDictObj({'id': 1, 'tags': ['a']})
+    assert next(records).id == 2
+    with pytest.raises(StopIteration):
+        next(records)
+    assert [record.id for record in DictObj.from_json_lines(lines.encode())] == [1, 2]
+    assert [record.id for record in DictObj.from_json_lines(lines.replace('\n', '\r\n'))] == [1, 2]
+
+
+def test_DictObj_pickle():
+    import pickle
+    from multiprocessing import Pool
+
+    import pytest
+    from pythonic_toolbox.utils.dict_utils import DictObj, FinalDictObj
+
+    # DictObj is pickled as plain data, locks are skipped, nested DictObj are rebuilt in one pass
+    obj = DictObj({'user': {'name': 'Albert'}, 'orders': [{'id': 1}]}, lock_policy='shared')
+    obj.user.name = 'Steve'  # locks are created
+    unpickled = pickle.loads(pickle.dumps(obj))
+    assert unpickled == obj
+    assert isinstance(unpickled.orders[0], DictObj)
+    assert unpickled.user._DictObj__synchronized_lock is unpickled._DictObj__synchronized_lock
+    assert pickle.loads(pickle.dumps(DictObj.view({'a': {'b': 1}}))) == DictObj({'a': {'b': 1}})
+
+    final_obj = FinalDictObj({'user': {'name': 'Albert'}, 'tags': ['a']})
+    unpickled = pickle.loads(pickle.dumps(final_obj))
+    assert unpickled == final_obj and unpickled.tags == ('a',)
+    with pytest.raises(RuntimeError):
+        unpickled.user.name = 'Steve'
+
+    # FinalDictObj can be published into shared memory once, workers load it by name
+    shm = final_obj.to_shared_memory()
+    try:
+        with Pool(2) as pool:
+            loaded = pool.map(FinalDictObj.from_shared_memory, [shm.name] * 2)
+        assert loaded == [final_obj, final_obj]
+    finally:
+        shm.close()
+        shm.unlink()
+
 
 def test_FinalDictObj():
     from typing import cast
@@ -496,6 +791,93 @@ def test_FinalDictObj():
     assert team.leader == deep_copy_of_team.leader
 
 
+def test_FinalDictObj_hash():
+    import copy
+
+    import pytest
+    from pythonic_toolbox.utils.dict_utils import FinalDictObj
+
+    # FinalDictObj is hashable, the structural hash is computed once and cached,
+    # so frozen configs can be used as cache keys, and deduplicated in sets
+    config_data = {'db': {'host': 'localhost', 'port': 3306}, 'replicas': [{'host': 'r1'}, {'host': 'r2'}]}
+    config = FinalDictObj(config_data)
+    assert hash(config) == hash(FinalDictObj(config_data)) == hash(copy.deepcopy(config))
+    assert len({config, FinalDictObj(config_data), FinalDictObj({'db': None})}) == 2
+    cache = {config: 'connection'}
+    assert cache[FinalDictObj(config_data, lazy=True)] == 'connection'
+
+    # views are not hashable, for the wrapped dict may be modified
+    with pytest.raises(TypeError):
+        hash(FinalDictObj.view(config_data))
+
+    # with intern=True, identical subtrees share one instance
+    servers = FinalDictObj({'primary': {'host': 'localhost', 'port': 3306},
+                            'backup': {'host': 'localhost', 'port': 3306}}, intern=True)
+    assert servers.primary is servers.backup
+    assert FinalDictObj(config_data, intern=True).db is FinalDictObj({'db': config_data['db']}, intern=True).db
+    assert FinalDictObj(config_data).db is not FinalDictObj(config_data).db
+    # equal values of different types (1 == 1.0 == True) are never interned together
+    flags = FinalDictObj({'x': {'a': 1}, 'y': {'a': True}, 'z': {'a': 1.0}, 'w': {'a': (1,)}, 'v': {'a': (True,)}},
+                         intern=True)
+    assert flags.y.a is True and type(flags.z.a) is float and flags.v.a == (True,)
+    assert flags.to_dict() == {'x': {'a': 1}, 'y': {'a': True}, 'z': {'a': 1.0}, 'w': {'a': [1]}, 'v': {'a': [True]}}
+    assert type(flags.to_dict()['y']['a']) is bool and type(flags.to_dict()['v']['a'][0]) is bool
+    # subtrees with unhashable leaves are simply not interned
+    tagged = FinalDictObj({'x': {'tags': {'a'}}, 'y': {'tags': {'a'}}, 'z': {'n': 1}, 'w': {'n': 1}}, intern=True)
+    assert tagged.x.tags == {'a'} and tagged.x is not tagged.y and tagged.z is tagged.w
+    with pytest.raises(ValueError):
+        FinalDictObj(config_data, lazy=True, intern=True)
+
+
+def test_CompactFinalDictObj():
+    import copy
+    import pickle
+
+    import pytest
+    from pythonic_toolbox.utils.dict_utils import CompactFinalDictObj, FinalDictObj
+
+    # for large amounts of records with the same keys,
+    # CompactFinalDictObj shares one key table among records, and only keeps a tuple of values for each
+    rows = [{'id': i, 'name': f'name_{i}', 'class': 'A', 'address': {'city': 'Beijing'}, 'tags': ['a']}
+            for i in range(3)]
+    records = [CompactFinalDictObj(row) for row in rows]
+    record = records[1]
+    assert not hasattr(record, '__dict__')
+
+    # behaves like FinalDictObj
+    assert record.name == 'name_1' and record['id'] == 1
+    assert record.address.city == 'Beijing'
+    assert record._class == 'A'
+    assert record.tags == ('a',)
+    assert list(record.keys()) == ['id', 'name', 'class', 'address', 'tags']
+    assert len(record) == 5 and 'name' in record
+    assert record.to_dict() == rows[1]
+    assert record == FinalDictObj(rows[1]) and FinalDictObj(rows[1]) == record
+    assert hash(record) == hash(FinalDictObj(rows[1]))  # hashable like FinalDictObj
+    assert len({record, CompactFinalDictObj(rows[1]), FinalDictObj(rows[1])}) == 1
+    assert record != records[0]
+    assert record == CompactFinalDictObj(dict(reversed(rows[1].items())))
+    assert repr(record) == repr(FinalDictObj(rows[1]))
+    with pytest.raises(AttributeError):
+        _ = record.age
+
+    with pytest.raises(RuntimeError) as exec_info:
+        record.name = 'Steve'
+    expected_error_str = 'Cannot modify attribute/item in an already initialized CompactFinalDictObj'
+    assert exec_info.value.args[0] == expected_error_str
+    with pytest.raises(RuntimeError):
+        record['name'] = 'Steve'
+    with pytest.raises(RuntimeError):
+        record.address.city = 'Shanghai'
+    with pytest.raises(RuntimeError):
+        record.pop('name')
+
+    # copy/deepcopy/pickle
+    assert copy.copy(record) == record
+    assert copy.deepcopy(record) == record and copy.deepcopy(record).address is not record.address
+    assert pickle.loads(pickle.dumps(record)) == record
+
+
 def test_RangeKeyDict():
     import pytest
     from pythonic_toolbox.utils.dict_utils import RangeKeyDict
@@ -530,6 +912,7 @@ def test_RangeKeyDict():
     assert exec_info.value.args[0] == 'KeyError: 150'
 
     assert range_key_dict.get(150, 'N/A') == 'N/A'
+    assert RangeKeyDict({}).get(150, 'N/A') == 'N/A'
 
     # test comparison with other RangeKeyDict
     assert RangeKeyDict({(0, 10): '1'}) == RangeKeyDict({(0, 10): '1'})
@@ -617,6 +1000,358 @@ def test_RangeKeyDict():
     assert age_categories_map[Age(70)] == 'Seniors'
 
 
+def test_RangeKeyDict_from_sorted():
+    import csv
+    import io
+
+    import pytest
+    from pythonic_toolbox.utils.dict_utils import RangeKeyDict
+
+    # build from (begin, end, value) rows already sorted by begin, e.g. streamed from a CSV file,
+    # overlapping is checked in one pass without sorting, begin == end means a single point
+    csv_file = io.StringIO('0,100,A\n100,200,B\n250,250,C\n300,400,D\n')
+    rows = ((int(begin), int(end), val) for begin, end, val in csv.reader(csv_file))
+    tariffs = RangeKeyDict.from_sorted(rows)
+    assert tariffs == RangeKeyDict({(0, 100): 'A', (100, 200): 'B', 250: 'C', (300, 400): 'D'})
+    assert tariffs[150] == 'B' and tariffs[250] == 'C'
+
+    with pytest.raises(ValueError) as exec_info:
+        RangeKeyDict.from_sorted([(0, 100, 'A'), (50, 150, 'B')])
+    assert exec_info.value.args[0] == "Overlap detected: (0, 100): 'A', (50, 150): 'B'"
+
+    with pytest.raises(ValueError) as exec_info:
+        RangeKeyDict.from_sorted([(100, 200, 'B'), (0, 100, 'A')])
+    assert exec_info.value.args[0] == "Input is not sorted by begin: (100, 200): 'B', (0, 100): 'A'"
+
+    with pytest.raises(ValueError):
+        RangeKeyDict.from_sorted([(100, 0, 'A')])
+
+
+def test_RangeKeyDict_range_queries():
+    import pytest
+    from pythonic_toolbox.utils.dict_utils import RangeKeyDict
+
+    tariffs: RangeKeyDict[int, str] = RangeKeyDict({
+        (0, 100): 'A',
+        (100, 200): 'B',
+        250: 'C',  # single point
+        (300, 400): 'D',
+    })
+
+    # ranges/single points overlapping [begin, end), keys are in the same form as input dict
+    assert list(tariffs.items(150, 260)) == [((100, 200), 'B'), (250, 'C')]
+    assert list(tariffs.items(200, 250)) == []
+    assert list(tariffs.items()) == [((0, 100), 'A'), ((100, 200), 'B'), (250, 'C'), ((300, 400), 'D')]
+
+    # segments clipped to [begin, end)
+    assert list(tariffs.segments_between(50, 350)) == [
+        RangeKeyDict.Segment(50, 100, 'A'),
+        RangeKeyDict.Segment(100, 200, 'B'),
+        RangeKeyDict.Segment(250, 250, 'C'),
+        RangeKeyDict.Segment(300, 350, 'D'),
+    ]
+
+    # sub-ranges not covered by any range, single points are not regarded as covering anything
+    assert list(tariffs.gaps(-50, 500)) == [(-50, 0), (200, 300), (400, 500)]
+    assert list(tariffs.gaps(10, 90)) == []
+
+    with pytest.raises(ValueError):
+        list(tariffs.gaps(100, 100))
+
+
+def test_RangeKeyDict_compile_dense():
+    import pytest
+    from pythonic_toolbox.utils.dict_utils import MutableRangeKeyDict, RangeKeyDict
+
+    age_buckets: RangeKeyDict[int, str] = RangeKeyDict({
+        (0, 2): 'Baby',
+        (2, 15): 'Children',
+        (15, 25): 'Youth',
+        (25, 65): 'Adults',
+        (65, 123): 'Seniors',
+    })
+
+    # for small integer domains, int keys are looked up by a single list index after compiling,
+    # other keys (out of domain, or not int) fall back to bisect
+    age_buckets.compile_dense()
+    assert age_buckets[0] == 'Baby'
+    assert age_buckets[30] == 'Adults'
+    assert age_buckets[30.5] == 'Adults'
+    assert age_buckets.get(123) is None
+    assert age_buckets.get(-1) is None
+
+    http_status_classes: RangeKeyDict[float, str] = RangeKeyDict({
+        (100, 200): 'Informational', (200, 300): 'Success', (300, 400): 'Redirection',
+        (400, 500): 'Client Error', (500, float('inf')): 'Server Error',
+    })
+    with pytest.raises(ValueError):
+        http_status_classes.compile_dense()  # domain cannot be inferred from infinite boundary
+    http_status_classes.compile_dense(domain=(100, 600))
+    assert http_status_classes[404] == 'Client Error'
+    assert http_status_classes[1000] == 'Server Error'
+
+    # the table is dropped when a MutableRangeKeyDict is changed
+    hours: MutableRangeKeyDict[int, str] = MutableRangeKeyDict({(0, 12): 'AM'})
+    hours.compile_dense(domain=(0, 24))
+    assert hours.get(13) is None
+    hours.add_range((12, 24), 'PM')
+    assert hours[13] == 'PM'
+
+
+def test_RangeKeyDict_get_many():
+    from pythonic_toolbox.utils.dict_utils import RangeKeyDict
+
+    range_key_dict: RangeKeyDict[float, str] = RangeKeyDict({
+        (0, 60): 'F',
+        (60, 80): 'C',
+        (80, 100): 'A',
+        100: 'A+',
+    })
+
+    # sorted keys are resolved in a single walk along the ranges
+    scores = [-1, 0, 59, 60, 79.5, 80, 100, 101]
+    assert range_key_dict.get_many(scores) == [None, 'F', 'F', 'C', 'C', 'A', 'A+', None]
+
+    # unsorted keys are sorted first, the results are returned in the original order
+    scores = [100, 59, 101, 0, 80, -1]
+    assert range_key_dict.get_many(scores, default='N/A') == ['A+', 'F', 'N/A', 'F', 'A', 'N/A']
+    assert range_key_dict.get_many([95, '95']) == ['A', None]
+
+    # iterator variant resolves keys lazily
+    results = range_key_dict.iter_many(iter([10, 65, 90, 5]))
+    assert next(results) == 'F'
+    assert list(results) == ['C', 'A', 'F']
+
+
+def test_RangeKeyDict_lookup_array():
+    import pytest
+    np = pytest.importorskip('numpy')
+    from pythonic_toolbox.utils.dict_utils import RangeKeyDict
+
+    range_key_dict: RangeKeyDict[float, str] = RangeKeyDict({
+        (0, 60): 'F',
+        (60, 80): 'C',
+        (80, 100): 'A',
+        100: 'A+',
+    })
+
+    # resolve a whole numeric array at once, numpy is only required when lookup_array is called
+    scores = np.array([-1, 0, 59.5, 60, 85, 100, 101])
+    values, found = range_key_dict.lookup_array(scores)
+    assert found.tolist() == [False, True, True, True, True, True, False]
+    assert values[found].tolist() == ['F', 'F', 'C', 'A', 'A+']
+
+    indices, found = range_key_dict.lookup_array(scores, return_indices=True)
+    assert indices.tolist() == [-1, 0, 0, 1, 2, 3, -1]
+
+    # values of one numeric type give a numeric array, any other values are kept as they are in an object array
+    values, found = RangeKeyDict({(0, 10): 1, (10, 20): 2}).lookup_array([5, 15])
+    assert values.dtype.kind == 'i' and values.tolist() == [1, 2]
+    values, found = RangeKeyDict({(0, 10): 1, (10, 20): 'a', (20, 30): 2.5}).lookup_array([5, 15, 25])
+    assert values.tolist() == [1, 'a', 2.5] and type(values[0]) is int
+    values, found = RangeKeyDict({(0, 10): [1], (10, 20): [1, 2], (20, 30): True}).lookup_array([5, 15, 25])
+    assert values.tolist() == [[1], [1, 2], True]
+
+    # nothing is found in an empty RangeKeyDict, values are None
+    values, found = RangeKeyDict({}).lookup_array([1, 2])
+    assert values.tolist() == [None, None] and not found.any()
+
+    with pytest.raises(TypeError):
+        RangeKeyDict({('a', 'b'): 1}).lookup_array(np.array(['a']))
+
+
+def test_MappedRangeKeyDict():
+    import os
+    import tempfile
+
+    import pytest
+    from pythonic_toolbox.utils.dict_utils import MappedRangeKeyDict, RangeKeyDict
+
+    range_key_dict: RangeKeyDict[int, dict] = RangeKeyDict({
+        (0, 100): {'country': 'CN'},
+        (100, 200): {'country': 'US'},
+        (300, 400): {'country': 'CN'},
+        500: {'country': 'JP'},
+    })
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # compile to a binary file once, then every worker process maps it in O(1) time,
+        # lookups run directly on the mapped buffers, so memory is shared among processes
+        path = os.path.join(tmp_dir, 'geo.rkd')
+        range_key_dict.save(path)
+        with MappedRangeKeyDict(path) as mapped:
+            assert len(mapped) == 4
+            assert mapped[50] == {'country': 'CN'}
+            assert mapped[100] == {'country': 'US'}
+            assert mapped[500] == {'country': 'JP'}
+            assert mapped.get(250) is None
+            assert all(mapped.get(key) == range_key_dict.get(key) for key in range(-10, 600, 7))
+            with pytest.raises(KeyError) as exec_info:
+                _ = mapped['50']
+            assert exec_info.value.args[0] == "KeyError: '50' is not comparable with other keys"
+
+        RangeKeyDict({(float('-inf'), 0.5): 'low', (0.5, float('inf')): 'high'}).save(path)
+        with MappedRangeKeyDict(path) as mapped:
+            assert mapped[0.1] == 'low' and mapped[0.5] == 'high'
+
+        with pytest.raises(TypeError):
+            RangeKeyDict({('a', 'b'): 1}).save(path)
+        # boundaries that cannot be stored exactly are rejected instead of giving wrong lookups
+        with pytest.raises(ValueError):
+            RangeKeyDict({(2 ** 60, 2 ** 60 + 1): 'a', (2 ** 60 + 1, 2 ** 60 + 2): 'b', (0.5, 1.5): 'c'}).save(path)
+        with pytest.raises(ValueError):
+            RangeKeyDict({(0, 2 ** 63): 'a'}).save(path)
+
+
+def test_HotSwapRangeKeyDict():
+    import threading
+    import time
+
+    from pythonic_toolbox.utils.dict_utils import HotSwapRangeKeyDict, RangeKeyDict
+
+    prices = {'version': 1}
+
+    def load_pricing_table():
+        # e.g. loading from DB, which is slow
+        time.sleep(0.01)
+        if prices['version'] < 0:
+            raise RuntimeError('DB is down')
+        return RangeKeyDict({(0, 100): prices['version'] * 10, (100, 1000): prices['version'] * 100})
+
+    pricing = HotSwapRangeKeyDict(load_pricing_table)
+    assert pricing[50] == 10 and pricing.get(2000) is None
+
+    # readers never block during reloading, and always see a complete table (of either version)
+    stop = threading.Event()
+    observed = set()
+
+    def read():
+        while not stop.is_set():
+            table = pricing.current  # one version for several lookups
+            observed.add((table[50], table[500]))
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    [t.start() for t in readers]
+    prices['version'] = 2
+    pricing.reload(wait=True)
+    stop.set()
+    [t.join() for t in readers]
+    assert observed <= {(10, 100), (20, 200)}
+    assert pricing[50] == 20
+
+    # the old table is kept if reloading fails
+    prices['version'] = -1
+    pricing.reload().join()
+    assert pricing[50] == 20
+
+    stats = pricing.stats
+    assert stats.swap_count == 1 and stats.failure_count == 1
+    assert stats.last_duration > 0 and stats.total_duration >= stats.last_duration
+    assert isinstance(stats.last_error, RuntimeError)
+
+
+def test_MutableRangeKeyDict():
+    import pytest
+    from pythonic_toolbox.utils.dict_utils import MutableRangeKeyDict, RangeKeyDict
+
+    rates: MutableRangeKeyDict[int, float] = MutableRangeKeyDict({(0, 100): 0.1, (200, 300): 0.3})
+
+    # ranges are changed one by one, overlapping is only checked against the neighbor ranges
+    rates.add_range((100, 200), 0.2)
+    rates.add_range(300, 0.35)  # single point
+    assert rates[150] == 0.2
+    assert rates[300] == 0.35
+    assert rates.get_many([50, 150, 250, 300, 400]) == [0.1, 0.2, 0.3, 0.35, None]
+
+    with pytest.raises(ValueError) as exec_info:
+        rates.add_range((250, 350), 0.4)
+    assert exec_info.value.args[0] == 'Overlap detected: (200, 300): 0.3, (250, 350): 0.4'
+    with pytest.raises(ValueError):
+        rates.add_range((0, 10), 0.4)  # duplicated left boundary key
+
+    rates.update_range((100, 200), 0.25)
+    assert rates[150] == 0.25
+    assert rates.remove_range((200, 300)) == 0.3
+    assert rates.get(250) is None
+    with pytest.raises(KeyError):
+        rates.remove_range((200, 250))  # must exactly match an existing range
+
+    assert rates == RangeKeyDict({(0, 100): 0.1, (100, 200): 0.25, 300: 0.35})
+
+
+def test_OverlappingRangeKeyDict():
+    import pytest
+    from pythonic_toolbox.utils.dict_utils import OverlappingRangeKeyDict, RangeKeyDict
+
+    # ranges may overlap, one range may have multiple values if given as (key, value) pairs
+    promotions: OverlappingRangeKeyDict[int, str] = OverlappingRangeKeyDict([
+        ((1, 31), 'monthly'),
+        ((10, 20), 'mid-month'),
+        ((10, 20), 'mid-month-vip'),
+        (15, 'flash'),  # single point
+        ((25, 40), 'cross-month'),
+    ])
+    assert len(promotions) == 5
+
+    # all the values covering a point, sorted by (begin, end) of ranges
+    assert promotions.get_all(15) == ['monthly', 'mid-month', 'mid-month-vip', 'flash']
+    assert promotions.get_all(20) == ['monthly']
+    assert promotions.get_all(30) == ['monthly', 'cross-month']
+    assert promotions.get_all(40) == []
+
+    # all the ranges overlapping [begin, end)
+    assert promotions.overlapping(18, 26) == [
+        RangeKeyDict.Segment(1, 31, 'monthly'),
+        RangeKeyDict.Segment(10, 20, 'mid-month'),
+        RangeKeyDict.Segment(10, 20, 'mid-month-vip'),
+        RangeKeyDict.Segment(25, 40, 'cross-month'),
+    ]
+    assert [segment.val for segment in promotions.overlapping(15, 16)] == [
+        'monthly', 'mid-month', 'mid-month-vip', 'flash']
+    assert promotions.overlapping(40, 50) == []
+
+    with pytest.raises(ValueError):
+        promotions.overlapping(20, 10)
+    with pytest.raises(KeyError):
+        promotions.get_all('15')
+
+
+def test_BoxKeyDict():
+    import pytest
+    from pythonic_toolbox.utils.dict_utils import BoxKeyDict
+
+    # shipping rates keyed by weight(kg) x distance(km), boxes are left-closed, right-open in every dimension
+    shipping_rates: BoxKeyDict[float, int] = BoxKeyDict({
+        ((0, 1), (0, 100)): 5,
+        ((0, 1), (100, 1000)): 10,
+        ((1, 10), (0, 100)): 8,
+        ((1, 10), (100, float('inf'))): 20,
+    })
+    assert shipping_rates.ndim == 2 and len(shipping_rates) == 4
+
+    # point query is a bisect in each dimension
+    assert shipping_rates[(0.5, 50)] == 5
+    assert shipping_rates[(0.5, 100)] == 10
+    assert shipping_rates[(5, 5000)] == 20
+    assert shipping_rates.get((0.5, 5000)) is None
+    assert shipping_rates.get((10, 50), 'N/A') == 'N/A'
+
+    with pytest.raises(KeyError) as exec_info:
+        _ = shipping_rates[(0.5,)]
+    assert exec_info.value.args[0] == 'KeyError: (0.5,)'
+
+    # works for N dimensions
+    box_key_dict = BoxKeyDict({((0, 10), (0, 10), (0, 10)): 'cube', ((0, 10), (0, 10), (10, 20)): 'upper cube'})
+    assert box_key_dict[(5, 5, 15)] == 'upper cube'
+
+    with pytest.raises(ValueError) as exec_info:
+        BoxKeyDict({((0, 10), (0, 10)): 'A', ((5, 15), (5, 15)): 'B'})
+    assert exec_info.value.args[0] == "Overlap detected: ((0, 10), (0, 10)): 'A', ((5, 15), (5, 15)): 'B'"
+
+    with pytest.raises(ValueError):
+        BoxKeyDict({((0, 10), 5): 'single point is not supported'})
+
+
 def test_StrKeyIdDict():
     import pytest
     from pythonic_toolbox.utils.dict_utils import StrKeyIdDict
@@ -641,6 +1376,9 @@ def test_StrKeyIdDict():
     assert StrKeyIdDict(data) != {'1': 'a', '2': 'b', '3': 'd'}
     assert StrKeyIdDict(data) != {1: 'a', 2: 'b', 3: 'c'}  # StrKeyIdDict assumes all keys are strings
 
+    my_dict |= {4: 'D'}
+    assert my_dict['4'] == 'D' and my_dict.keys() == {'1', '2', '3', '4'}  # key normalized as well
+
     # test delete key
     del my_dict[4]
     assert my_dict.keys() == {'1', '2', '3'}  # '4' is not in the dict anymore
@@ -703,3 +1441,179 @@ def test_StrKeyIdDict():
     # delete key 'data', should not affect other keys
     del my_dict['data']
     assert my_dict['1'] == 'a'
+
+
+def test_IntIndexedStrKeyIdDict():
+    import pytest
+    from copy import copy, deepcopy
+    from pythonic_toolbox.utils.dict_utils import IntIndexedStrKeyIdDict, StrKeyIdDict
+
+    # same behaviours as StrKeyIdDict, plus an int index so int IDs are looked up without str(key)
+    my_dict = IntIndexedStrKeyIdDict({1: 'a', 2: 'b', '3': 'c', 'some-uuid': 'd'})
+    assert isinstance(my_dict, StrKeyIdDict)
+    assert my_dict == StrKeyIdDict({1: 'a', 2: 'b', '3': 'c', 'some-uuid': 'd'})
+    assert my_dict.keys() == {'1', '2', '3', 'some-uuid'}  # keys are still str type
+    assert my_dict[1] == my_dict['1'] == 'a'
+    assert my_dict[3] == my_dict['3'] == 'c'
+    assert 3 in my_dict and '3' in my_dict and 4 not in my_dict
+    assert my_dict.get(4, 'missing') == 'missing'
+    with pytest.raises(KeyError):
+        _ = my_dict[4]
+
+    # int and canonical int string keys share one entry, whichever form is used for writing
+    my_dict['4'] = 'd'
+    assert my_dict[4] == 'd'
+    my_dict[4] = 'D'
+    assert my_dict['4'] == 'D'
+    del my_dict['4']
+    assert 4 not in my_dict and '4' not in my_dict
+    my_dict |= {5: 'e'}
+    assert my_dict['5'] == 'e'
+    assert my_dict.pop(5) == 'e'
+    assert 5 not in my_dict
+
+    # non-canonical int strings are plain str keys, just like in StrKeyIdDict
+    my_dict['007'] = 'bond'
+    assert 7 not in my_dict
+    assert my_dict['007'] == 'bond'
+
+    # copies do not share the int index
+    copy_dict, deepcopy_dict = copy(my_dict), deepcopy(my_dict)
+    my_dict[1] = 'A'
+    assert copy_dict[1] == deepcopy_dict[1] == 'a'
+    copy_dict.clear()
+    assert 1 not in copy_dict and my_dict[1] == 'A'
+
+
+def test_StrKeyIdDict_batch():
+    import pytest
+    from pythonic_toolbox.utils.dict_utils import IntIndexedStrKeyIdDict, StrKeyIdDict
+
+    rows = [{'id': 1, 'name': 'Alice'}, {'id': '2', 'name': 'Bob'}, {'id': 3, 'name': 'Carol'}]
+
+    # build from rows in a single pass, key can be an item key or a callable
+    users = StrKeyIdDict.from_rows(rows, key='id')
+    assert users.keys() == {'1', '2', '3'}
+    assert users[1] is rows[0] and users['2'] is rows[1]
+    assert StrKeyIdDict.from_rows(rows, key=lambda row: row['name']).keys() == {'Alice', 'Bob', 'Carol'}
+    # without key, rows are (id, value) pairs
+    assert StrKeyIdDict.from_rows([(1, 'a'), ('2', 'b')]) == StrKeyIdDict({1: 'a', '2': 'b'})
+
+    with pytest.raises(TypeError):
+        StrKeyIdDict.from_rows([{'id': 1}, {'id': '1'}], key='id')  # '1' and 1 are the same ID
+    with pytest.raises(TypeError):
+        StrKeyIdDict.from_rows([(1.0, 'a')])  # float is not a valid ID
+
+    # batch access, missing keys get the default
+    assert users.get_many([3, '1', 4]) == [rows[2], rows[0], None]
+    assert users.get_many(['4'], default={}) == [{}]
+
+    # batch update, later values win just like dict.update
+    users.set_many({4: {'id': 4, 'name': 'Dave'}, '1': {'id': 1, 'name': 'Alice Smith'}})
+    assert users[4]['name'] == 'Dave' and users['1']['name'] == 'Alice Smith'
+    users.set_many([(5, 'e'), ('5', 'E')])
+    assert users[5] == 'E'
+
+    # subclasses keep their own indexes when built or updated in batch
+    indexed_users = IntIndexedStrKeyIdDict.from_rows(rows, key='id')
+    assert indexed_users.get_many([2, '3', 4]) == [rows[1], rows[2], None]
+    indexed_users.set_many({'4': 'd'})
+    assert indexed_users[4] == 'd' and 4 in indexed_users
+
+
+def test_LRUStrKeyIdDict():
+    import pytest
+    from copy import copy
+    from pythonic_toolbox.utils.dict_utils import LRUStrKeyIdDict, StrKeyIdDict
+
+    # bounded cache in front of DB lookups, keeps the int/str key normalization of StrKeyIdDict
+    cache = LRUStrKeyIdDict({1: 'a', 2: 'b'}, maxsize=3)
+    assert cache == StrKeyIdDict({1: 'a', 2: 'b'})
+    cache[3] = 'c'
+    assert cache['1'] == 'a'  # reading 1 marks it as recently used
+    cache['4'] = 'd'  # exceeds maxsize, evicts the least recently used: 2
+    assert 2 not in cache
+    assert cache.keys() == {'1', '3', '4'}
+    assert cache.get(2) is None and cache.get(4) == 'd'
+    stats = cache.stats
+    assert (stats.hits, stats.misses, stats.evictions, stats.size, stats.maxsize) == (2, 1, 1, 3, 3)
+
+    # entries expire ttl seconds after they were written, the timer can be replaced for testing
+    now = [0.0]
+    cache = LRUStrKeyIdDict(maxsize=100, ttl=10, timer=lambda: now[0])
+    cache.set_many({1: 'a', 2: 'b'})
+    now[0] = 5
+    cache[2] = 'B'  # rewriting refreshes the ttl
+    now[0] = 12
+    assert 1 not in cache and cache[2] == 'B'
+    assert cache.get_many([1, 2]) == [None, 'B']
+    now[0] = 15
+    assert len(cache) == 0
+    assert cache.stats.expirations == 2
+
+    # from_rows accepts the cache options too
+    cache = LRUStrKeyIdDict.from_rows([{'id': i} for i in range(10)], key='id', maxsize=5)
+    assert cache.keys() == {'5', '6', '7', '8', '9'}
+    assert list(cache) == ['5', '6', '7', '8', '9']  # least recently used first
+    copy_cache = copy(cache)
+    copy_cache[10] = {'id': 10}
+    assert '5' not in copy_cache and '5' in cache
+    # keys/values/items are snapshots, entries can be read while iterating over them
+    assert [cache[key]['id'] for key in cache.keys()] == [5, 6, 7, 8, 9]
+    assert cache.popitem() == ('5', {'id': 5})  # the least recently used one
+
+    # merging keeps the cache options
+    merged = LRUStrKeyIdDict({1: 'a'}, maxsize=2, ttl=5) | {2: 'b', 3: 'c'}
+    assert (merged.maxsize, merged.ttl) == (2, 5) and merged.keys() == {'2', '3'}
+    merged = {2: 'b', 3: 'c'} | LRUStrKeyIdDict({1: 'a'}, maxsize=2, ttl=5)
+    assert (merged.maxsize, merged.ttl) == (2, 5) and merged.keys() == {'3', '1'}
+
+    with pytest.raises(ValueError):
+        LRUStrKeyIdDict(maxsize=0)
+
+
+def test_ShardedStrKeyIdDict():
+    import pickle
+    import pytest
+    import threading
+    from pythonic_toolbox.utils.dict_utils import ShardedStrKeyIdDict, StrKeyIdDict
+
+    # same mapping API as StrKeyIdDict, safe to share between threads without an external lock
+    users = ShardedStrKeyIdDict({1: 'a', '2': 'b'}, shards=4)
+    assert users.shard_count == 4
+    assert users == StrKeyIdDict({1: 'a', 2: 'b'})
+    assert users[1] == users['1'] == 'a'
+    assert 2 in users and users.get(3) is None
+    assert users.setdefault(3, 'c') == 'c' and users.setdefault('3', 'C') == 'c'
+    assert users.pop(3) == 'c' and users.pop(3, None) is None
+    users.update({4: 'd'})
+    users.set_many([(5, 'e'), (6, 'f')])
+    assert users.get_many([4, '5', 7]) == ['d', 'e', None]
+    assert users.keys() == {'1', '2', '4', '5', '6'}
+    del users[6]
+    assert sorted(users) == ['1', '2', '4', '5']
+
+    # writers on different keys only contend when their keys share a shard
+    def write(offset):
+        for i in range(1000):
+            users[offset + i] = i
+
+    threads = [threading.Thread(target=write, args=(offset,)) for offset in range(10000, 50000, 10000)]
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+    assert len(users) == 4 + 4 * 1000
+    assert users[40999] == 999
+
+    # copies and pickles are rebuilt from a snapshot, with the same number of shards
+    restored = pickle.loads(pickle.dumps(users))
+    assert restored == users and restored.shard_count == 4
+    assert ShardedStrKeyIdDict.from_rows([{'id': 1}], key='id', shards=2).shard_count == 2
+    merged = ShardedStrKeyIdDict({1: 'a'}, shards=2) | {1: 'A', 2: 'b'}
+    assert merged.shard_count == 2 and merged == {'1': 'A', '2': 'b'}
+    merged = {1: 'A', 2: 'b'} | ShardedStrKeyIdDict({1: 'a'}, shards=2)
+    assert merged.shard_count == 2 and merged == {'1': 'a', '2': 'b'}
+    users.clear()
+    assert len(users) == 0 and len(restored) == 4004
+
+    with pytest.raises(ValueError):
+        ShardedStrKeyIdDict(shards=0)